@@ -1,19 +1,20 @@
 import streamlit as st
 from datetime import datetime
 import os
+from dates import format_date
 from crud import (
-    load_data,
     confirm_booking,
     booking_canceling,
     booking_update,
     show_my_pending_booked_cars,
     show_my_confirmed_booked_cars,
-    show_my_booking_history
+    show_my_booking_history_page
 )
 
 # Constants
 BOOKINGS_FILE_PATH = 'Rental-Car-Business-Demo/data/bookings.csv'
 CARS_FILE_PATH = 'Rental-Car-Business-Demo/data/cars.csv'
+HISTORY_PAGE_SIZE = 10
 
 # Retrieve the path to the temporary file from the environment variable
 user_id_file_path = os.getenv('USER_ID_FILE')
@@ -28,9 +29,6 @@ def load_user_id(file_path):
 
 user_id = load_user_id(user_id_file_path)
 print(user_id)
-# Load data
-cars_df = load_data(CARS_FILE_PATH)
-
 # Select box to choose the view
 view_option = st.selectbox(
     "Select View",
@@ -45,11 +43,10 @@ if view_option == "Pending Bookings":
 
     if not pending_bookings.empty:
         for booking in pending_bookings.itertuples():
-            car = cars_df[cars_df['car_id'] == booking.car_id].iloc[0]
-            st.image(car['image_path'], width=300)
-            st.markdown(f"**Car:** {car['name']} ({car.car_type})")
-            st.markdown(f"**Start Date:** {booking.start_date}")
-            st.markdown(f"**End Date:** {booking.end_date}")
+            st.image(booking.image_path, width=300)
+            st.markdown(f"**Car:** {booking.name} ({booking.car_type})")
+            st.markdown(f"**Start Date:** {format_date(booking.start_date)}")
+            st.markdown(f"**End Date:** {format_date(booking.end_date)}")
             st.markdown(f"**Total Price:** ${booking.total_price}")
 
             # Confirm button
@@ -72,8 +69,8 @@ if view_option == "Pending Bookings":
 
             # Update button
             with st.form(key=f"update_{booking.booking_id}"):
-                new_start_date = st.date_input("New Start Date", datetime.strptime(booking.start_date, '%d/%m/%Y'))
-                new_end_date = st.date_input("New End Date", datetime.strptime(booking.end_date, '%d/%m/%Y'))
+                new_start_date = st.date_input("New Start Date", booking.start_date.date())
+                new_end_date = st.date_input("New End Date", booking.end_date.date())
                 submit_button = st.form_submit_button("Update Booking")
                 if submit_button:
                     if new_start_date > new_end_date:
@@ -95,11 +92,10 @@ elif view_option == "Confirmed Bookings":
 
     if not confirmed_bookings.empty:
         for booking in confirmed_bookings.itertuples():
-            car = cars_df[cars_df['car_id'] == booking.car_id].iloc[0]
-            st.image(car['image_path'], width=300)
-            st.markdown(f"**Car:** {car['name']} ({car.car_type})")
-            st.markdown(f"**Start Date:** {booking.start_date}")
-            st.markdown(f"**End Date:** {booking.end_date}")
+            st.image(booking.image_path, width=300)
+            st.markdown(f"**Car:** {booking.name} ({booking.car_type})")
+            st.markdown(f"**Start Date:** {format_date(booking.start_date)}")
+            st.markdown(f"**End Date:** {format_date(booking.end_date)}")
             st.markdown(f"**Total Price:** ${booking.total_price}")
 
             # Cancel button
@@ -113,8 +109,8 @@ elif view_option == "Confirmed Bookings":
 
             # Update button
             with st.form(key=f"update_{booking.booking_id}"):
-                new_start_date = st.date_input("New Start Date", datetime.strptime(booking.start_date, '%d/%m/%Y'))
-                new_end_date = st.date_input("New End Date", datetime.strptime(booking.end_date, '%d/%m/%Y'))
+                new_start_date = st.date_input("New Start Date", booking.start_date.date())
+                new_end_date = st.date_input("New End Date", booking.end_date.date())
                 submit_button = st.form_submit_button("Update Booking")
                 if submit_button:
                     if new_start_date > new_end_date:
@@ -131,18 +127,32 @@ elif view_option == "Confirmed Bookings":
 
 elif view_option == "Booking History":
     st.markdown("## Booking History")
-    booking_history = show_my_booking_history(user_id)
+    # Cursors of the pages visited so far, the last one is the page shown
+    if 'history_cursors' not in st.session_state:
+        st.session_state.history_cursors = [None]
+    booking_history, next_cursor = show_my_booking_history_page(
+        user_id, st.session_state.history_cursors[-1], HISTORY_PAGE_SIZE)
 
     if not booking_history.empty:
         for booking in booking_history.itertuples():
-            car = cars_df[cars_df['car_id'] == booking.car_id].iloc[0]
-            st.image(car['image_path'],width=300)
-            st.markdown(f"**Car:** {car['name']} ({car.car_type})")
-            print("car.name", car['name'])
-            st.markdown(f"**Start Date:** {booking.start_date}")
-            st.markdown(f"**End Date:** {booking.end_date}")
+            st.image(booking.image_path, width=300)
+            st.markdown(f"**Car:** {booking.name} ({booking.car_type})")
+            st.markdown(f"**Start Date:** {format_date(booking.start_date)}")
+            st.markdown(f"**End Date:** {format_date(booking.end_date)}")
             st.markdown(f"**Total Price:** ${booking.total_price}")
             st.markdown(f"**Status:** {'Confirmed' if booking.booking_status == 2 else 'Cancelled'}")
             st.markdown("-------------------------------")
+
+        previous_column, next_column = st.columns(2)
+        if len(st.session_state.history_cursors) > 1 and previous_column.button("Newer bookings"):
+            st.session_state.history_cursors.pop()
+            st.rerun()
+        if next_cursor is not None and next_column.button("Older bookings"):
+            st.session_state.history_cursors.append(next_cursor)
+            st.rerun()
+    elif len(st.session_state.history_cursors) > 1:
+        # The page emptied since it was opened, e.g. bookings were removed: start over
+        st.session_state.history_cursors = [None]
+        st.rerun()
     else:
         st.markdown("No booking history found.")
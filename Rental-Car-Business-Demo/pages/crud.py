@@ -3,6 +3,7 @@
 import pandas as pd
 import os
 from datetime import datetime
+from store import booking_store, fleet_store, user_store, get_store, booking_view
 
 # File paths
 CARS_FILE_PATH = 'Rental-Car-Business-Demo/data/cars.csv'
@@ -17,13 +18,14 @@ def load_data(file_path):
     Args:
         file_path (str): Path to the CSV file.
 
+    The table is served from the shared in-memory store and only re-read when the file
+    changed on disk. Booking dates come back as datetime64 columns. The returned DataFrame
+    must not be modified in place.
+
     Returns:
         pd.DataFrame: DataFrame containing the loaded data. Returns an empty DataFrame if the file does not exist.
     """
-    if os.path.exists(file_path):
-        return pd.read_csv(file_path)
-    else:
-        return pd.DataFrame()
+    return get_store(file_path).data()
 
 
 def save_data(df, file_path):
@@ -34,7 +36,7 @@ def save_data(df, file_path):
         df (pd.DataFrame): DataFrame to be saved.
         file_path (str): Path to the CSV file where the DataFrame will be saved.
     """
-    df.to_csv(file_path, index=False)
+    get_store(file_path).save(df)
 
 
 def car_search(car_type, price_range, start_date, end_date):
@@ -48,39 +50,13 @@ def car_search(car_type, price_range, start_date, end_date):
         end_date (str): The end date for the rental period in 'dd/mm/yyyy' format.
 
     Returns:
-        pd.DataFrame: DataFrame containing available cars that match the search criteria.
+        pd.DataFrame: DataFrame containing available cars that match the search criteria, cheapest first.
     """
-    cars_df = load_data(CARS_FILE_PATH)
-    bookings_df = load_data(BOOKINGS_FILE_PATH)
-
     start_date = datetime.strptime(start_date, '%d/%m/%Y')
     end_date = datetime.strptime(end_date, '%d/%m/%Y')
 
-    def is_car_available(car_id, start_date, end_date):
-        """
-        Check if a specific car is available during the given rental period.
-
-        Args:
-            car_id (int): ID of the car to check.
-            start_date (datetime): Start date of the rental period.
-            end_date (datetime): End date of the rental period.
-
-        Returns:
-            bool: True if the car is available, False otherwise.
-        """
-        car_bookings = bookings_df[(bookings_df['car_id'] == car_id) & (bookings_df['booking_status'] == 2)]
-        for booking in car_bookings.itertuples():
-            booking_start_date = datetime.strptime(booking.start_date, '%d/%m/%Y')
-            booking_end_date = datetime.strptime(booking.end_date, '%d/%m/%Y')
-            if booking_start_date <= end_date and booking_end_date >= start_date:
-                return False
-        return True
-
-    available_cars = cars_df[
-        (cars_df['car_type'] == car_type) & (cars_df['price'] >= price_range[0]) & (cars_df['price'] <= price_range[1])]
-    available_cars = available_cars[
-        available_cars['car_id'].apply(lambda car_id: is_car_available(car_id, start_date, end_date))]
-    return available_cars
+    return fleet_store.search(
+        car_type, price_range, where=lambda car_ids: booking_store.available_mask(car_ids, start_date, end_date))
 
 
 def car_booking(user_id, car_id, start_date, end_date):
@@ -96,32 +72,25 @@ def car_booking(user_id, car_id, start_date, end_date):
     Returns:
         pd.DataFrame: Updated DataFrame of bookings including the new booking.
     """
-    cars_df = load_data(CARS_FILE_PATH)
-    bookings_df = load_data(BOOKINGS_FILE_PATH)
-
     start_date = datetime.strptime(start_date, '%d/%m/%Y')
     end_date = datetime.strptime(end_date, '%d/%m/%Y')
 
     days = (end_date - start_date).days + 1
-    car_price = cars_df.loc[cars_df['car_id'] == car_id, 'price'].values[0]
+    car_price = fleet_store.price(car_id)
     total_price = days * car_price
 
-    new_booking_id = bookings_df['booking_id'].max() + 1 if not bookings_df.empty else 1
     new_booking = {
-        'booking_id': new_booking_id,
         'car_id': car_id,
         'user_id': user_id,
-        'start_date': start_date.strftime('%d/%m/%Y'),
-        'end_date': end_date.strftime('%d/%m/%Y'),
+        'start_date': start_date,
+        'end_date': end_date,
         'total_price': total_price,
         'booking_status': 1  # Status 1 = Pending
     }
 
-    new_booking_df = pd.DataFrame([new_booking])
-    bookings_df = pd.concat([bookings_df, new_booking_df], ignore_index=True)
-    save_data(bookings_df, BOOKINGS_FILE_PATH)
+    booking_store.insert(new_booking)
 
-    return bookings_df
+    return booking_store.data()
 
 
 def confirm_booking(booking_id):
@@ -135,19 +104,18 @@ def confirm_booking(booking_id):
         pd.DataFrame: Updated DataFrame of bookings with the confirmed booking.
 
     Raises:
-        ValueError: If the booking ID does not exist or is not in pending status.
+        ValueError: If the booking ID does not exist, is not in pending status or its car has been
+            confirmed for an overlapping period in the meantime.
     """
-    bookings_df = load_data(BOOKINGS_FILE_PATH)
-
-    if booking_id in bookings_df['booking_id'].values:
-        if bookings_df.loc[bookings_df['booking_id'] == booking_id, 'booking_status'].values[0] == 1:
-            bookings_df.loc[bookings_df['booking_id'] == booking_id, 'booking_status'] = 2  # Status 2 = Confirmed
-            save_data(bookings_df, BOOKINGS_FILE_PATH)
-            return bookings_df
-        else:
+    def check(booking):
+        # Runs under the bookings write lock, so two sessions cannot confirm the same car twice
+        if booking['booking_status'] != 1:
             raise ValueError(f"Booking ID {booking_id} is not in pending status.")
-    else:
-        raise ValueError(f"Booking ID {booking_id} does not exist.")
+        if not booking_store.is_car_available(booking['car_id'], booking['start_date'], booking['end_date']):
+            raise ValueError(f"Car ID {booking['car_id']} is no longer available for booking ID {booking_id}.")
+
+    booking_store.update(booking_id, check=check, booking_status=2)  # Status 2 = Confirmed
+    return booking_store.data()
 
 
 def booking_canceling(booking_id):
@@ -160,10 +128,8 @@ def booking_canceling(booking_id):
     Returns:
         pd.DataFrame: Updated DataFrame of bookings with the cancelled booking.
     """
-    bookings_df = load_data(BOOKINGS_FILE_PATH)
-    bookings_df.loc[bookings_df['booking_id'] == booking_id, 'booking_status'] = 0  # Status 0 = Cancelled
-    save_data(bookings_df, BOOKINGS_FILE_PATH)
-    return bookings_df
+    booking_store.update(booking_id, booking_status=0)  # Status 0 = Cancelled
+    return booking_store.data()
 
 
 def booking_update(booking_id, new_start_date, new_end_date):
@@ -177,16 +143,21 @@ def booking_update(booking_id, new_start_date, new_end_date):
 
     Returns:
         pd.DataFrame: Updated DataFrame of bookings with the modified booking.
-    """
-    bookings_df = load_data(BOOKINGS_FILE_PATH)
 
+    Raises:
+        ValueError: If the booking ID does not exist or the booking is confirmed and its car is
+            not available for the new dates.
+    """
     new_start_date = datetime.strptime(new_start_date, '%d/%m/%Y')
     new_end_date = datetime.strptime(new_end_date, '%d/%m/%Y')
 
-    bookings_df.loc[bookings_df['booking_id'] == booking_id, 'start_date'] = new_start_date.strftime('%d/%m/%Y')
-    bookings_df.loc[bookings_df['booking_id'] == booking_id, 'end_date'] = new_end_date.strftime('%d/%m/%Y')
-    save_data(bookings_df, BOOKINGS_FILE_PATH)
-    return bookings_df
+    def check(booking):
+        if booking['booking_status'] == 2 and not booking_store.is_car_available(
+                booking['car_id'], new_start_date, new_end_date, exclude_booking_id=booking_id):
+            raise ValueError(f"Car ID {booking['car_id']} is not available for the new dates.")
+
+    booking_store.update(booking_id, check=check, start_date=new_start_date, end_date=new_end_date)
+    return booking_store.data()
 
 
 def show_my_pending_booked_cars(user_id):
@@ -199,12 +170,7 @@ def show_my_pending_booked_cars(user_id):
     Returns:
         pd.DataFrame: DataFrame of cars that are currently booked by the user with pending status.
     """
-    bookings_df = load_data(BOOKINGS_FILE_PATH)
-    cars_df = load_data(CARS_FILE_PATH)
-
-    user_bookings = bookings_df[(bookings_df['user_id'] == user_id) & (bookings_df['booking_status'] == 1)]
-    booked_cars = pd.merge(user_bookings, cars_df, on='car_id')
-    return booked_cars
+    return booking_view.rows(booking_store.user_booking_ids(user_id, [1]))
 
 
 def show_my_confirmed_booked_cars(user_id):
@@ -217,12 +183,7 @@ def show_my_confirmed_booked_cars(user_id):
     Returns:
         pd.DataFrame: DataFrame of cars that are currently booked by the user with confirmed status.
     """
-    bookings_df = load_data(BOOKINGS_FILE_PATH)
-    cars_df = load_data(CARS_FILE_PATH)
-
-    user_bookings = bookings_df[(bookings_df['user_id'] == user_id) & (bookings_df['booking_status'] == 2)]
-    booked_cars = pd.merge(user_bookings, cars_df, on='car_id')
-    return booked_cars
+    return booking_view.rows(booking_store.user_booking_ids(user_id, [2]))
 
 
 def show_my_booking_history(user_id):
@@ -235,12 +196,24 @@ def show_my_booking_history(user_id):
     Returns:
         pd.DataFrame: DataFrame of all bookings (past and present) by the user, excluding pending bookings.
     """
-    bookings_df = load_data(BOOKINGS_FILE_PATH)
-    cars_df = load_data(CARS_FILE_PATH)
+    return booking_view.rows(booking_store.user_booking_ids(user_id, [0, 2]))
+
 
-    user_history = bookings_df[(bookings_df['user_id'] == user_id) & (bookings_df['booking_status'] != 1)]
-    booking_history = pd.merge(user_history, cars_df, on='car_id')
-    return booking_history
+def show_my_booking_history_page(user_id, cursor=None, page_size=10):
+    """
+    Retrieve one page of the booking history of a specific user, most recent booking first.
+
+    Args:
+        user_id (int): ID of the user whose booking history is to be retrieved.
+        cursor (str, optional): Cursor returned with the previous page, None for the first page.
+        page_size (int): Maximum number of bookings in the page.
+
+    Returns:
+        tuple: DataFrame of the page's bookings (excluding pending bookings) with their car details,
+            and the cursor of the next page (None on the last page).
+    """
+    booking_ids, next_cursor = booking_store.user_booking_ids_page(user_id, [0, 2], page_size, cursor)
+    return booking_view.rows(booking_ids), next_cursor
 
 
 def show_personal_info(user_id):
@@ -253,7 +226,7 @@ def show_personal_info(user_id):
     Returns:
         pd.DataFrame: DataFrame containing personal information of the specified user.
     """
-    users_df = load_data(USERS_FILE_PATH)
+    users_df = user_store.data()
     return users_df[users_df['user_id'] == user_id]
 
 
@@ -267,7 +240,7 @@ def show_car_info(car_id):
     Returns:
         pd.DataFrame: DataFrame containing details of the specified car.
     """
-    cars_df = load_data(CARS_FILE_PATH)
+    cars_df = fleet_store.data()
     return cars_df[cars_df['car_id'] == car_id]
 
 
@@ -278,5 +251,4 @@ def show_cars():
     Returns:
         pd.DataFrame: DataFrame containing details of all cars.
     """
-    cars_df = load_data(CARS_FILE_PATH)
-    return cars_df
+    return fleet_store.data()
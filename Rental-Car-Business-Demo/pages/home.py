@@ -2,10 +2,10 @@ import streamlit as st
 import os
 import pandas as pd
 from datetime import datetime
-from crud import car_search, car_booking
+from crud import car_search, car_booking, show_cars
 
-# Convert the car data to a DataFrame
-cars_df = pd.read_csv("Rental-Car-Business-Demo/data/cars.csv")
+# Load the car data from the shared store
+cars_df = show_cars()
 
 # Extract unique car types for the selectbox
 unique_car_types = cars_df['car_type'].unique()
@@ -6,16 +6,11 @@ import sys
 import signal
 import create_csv_files
 
-USER_ID_FILE_PATH = 'Rental-Car-Business-Demo/data/user_id.conf'
-# Define paths
-users_csv_path = 'Rental-Car-Business-Demo/data/users.csv'
+# All data paths are relative to the repository root, which also holds the shared data layer
+sys.path.append(os.getcwd())
+from store import user_store
 
-# Load user data
-if os.path.exists(users_csv_path):
-    users_df = pd.read_csv(users_csv_path)
-else:
-    # Create a DataFrame if users.csv does not exist
-    users_df = pd.DataFrame(columns=['user_id', 'name', 'email', 'phone', 'address'])
+USER_ID_FILE_PATH = 'Rental-Car-Business-Demo/data/user_id.conf'
 
 # Set page configuration
 st.set_page_config(page_title='Login/Registration', page_icon='🔑', layout='centered')
@@ -55,7 +50,7 @@ if st.session_state['page'] == 'Login':
 
     if login_button:
         if email:
-            user = users_df[users_df['email'] == email]
+            user = user_store.find('email', email)
             if not user.empty:
                 st.session_state['user'] = user.iloc[0].to_dict()  # Store user info in session state
                 st.session_state['page'] = 'Redirect'  # Set page to redirect
@@ -79,26 +74,15 @@ elif st.session_state['page'] == 'Register':
 
     if st.button("Submit Registration"):
         if full_name and email and phone and address:
-            # Determine new user ID
-            if not users_df.empty:
-                new_user_id = users_df['user_id'].max() + 1
-            else:
-                new_user_id = 101  # Starting ID
-
-            # Append new user to DataFrame
-            new_user = pd.DataFrame({
-                'user_id': [new_user_id],
-                'name': [full_name],
-                'email': [email],
-                'phone': [phone],
-                'address': [address]
+            # Append the new user to users.csv, the user ID comes from the persisted sequence
+            user_store.insert({
+                'user_id': None,
+                'name': full_name,
+                'email': email,
+                'phone': phone,
+                'address': address
             })
 
-            users_df = pd.concat([users_df, new_user], ignore_index=True)
-
-            # Save updated DataFrame to CSV
-            users_df.to_csv(users_csv_path, index=False)
-
             st.success("Registration successful! You can now log in.")
             st.session_state['page'] = 'Login'  # Go back to login page
         else:
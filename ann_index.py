@@ -0,0 +1,296 @@
+import argparse
+import os
+import time
+from typing import Optional, Tuple
+import numpy as np
+from quantization import RESCORE_FACTOR, VECTOR_DTYPE, QuantizedVectors
+
+# Vector search: 'auto' (IVF from ANN_MIN_SIZE vectors, exact below), 'exact' or 'ivf'
+ANN_MODE = os.getenv('RENTAL_ANN', 'auto')
+ANN_MIN_SIZE = int(os.getenv('RENTAL_ANN_MIN_SIZE', '20000'))
+# Number of k-means lists (0: about 4 * sqrt(number of vectors)) and of lists scanned per query
+ANN_LISTS = int(os.getenv('RENTAL_ANN_LISTS', '0'))
+ANN_PROBE = int(os.getenv('RENTAL_ANN_PROBE', '8'))
+
+
+def _top(scores: np.ndarray, k: int) -> np.ndarray:
+    # Positions of the k highest scores, best first
+    if k >= len(scores):
+        return np.argsort(-scores, kind='stable')
+    top = np.argpartition(scores, -k)[-k:]
+    return top[np.argsort(-scores[top], kind='stable')]
+
+
+class ExactIndex:
+    """
+    Brute-force inner-product search over every vector. Exact, and the fastest choice for small corpora.
+
+    After `quantize()`, candidates are scored on float16 or int8 copies of the vectors held in
+    memory, and the best `rescore` * k of them are re-scored with the float32 vectors (usually
+    memory-mapped, so only those rows are read) to restore the exact order.
+    """
+
+    def __init__(self, vectors: np.ndarray):
+        self.vectors = vectors
+        self.quantized = None
+        self.rescore = RESCORE_FACTOR
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    def quantize(self, dtype: str = VECTOR_DTYPE, rescore: int = RESCORE_FACTOR) -> 'ExactIndex':
+        """
+        Search on vectors stored with a smaller dtype.
+
+        Args:
+            dtype (str): 'float32' (no quantization), 'float16' or 'int8'.
+            rescore (int): Candidates re-scored in float32 per result, 0 to rank by the quantized scores alone.
+
+        Returns:
+            ExactIndex: This index.
+        """
+        self.quantized = QuantizedVectors.quantize(self.vectors, dtype) if dtype != 'float32' else None
+        self.rescore = rescore
+        return self
+
+    def score(self, ids, query: np.ndarray) -> np.ndarray:
+        """Return the exact inner products of the given vectors with a query."""
+        return self.vectors[ids] @ query
+
+    def _select(self, ids: Optional[np.ndarray], query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        # Best k of the candidate vectors (all of them if ids is None), best first, with their scores
+        if self.quantized is None:
+            scores = self.vectors @ query if ids is None else self.score(ids, query)
+            top = _top(scores, k)
+            return (top if ids is None else ids[top]), scores[top]
+        scores = self.quantized.dot(query, ids)
+        if not self.rescore:
+            top = _top(scores, k)
+            return (top if ids is None else ids[top]), scores[top]
+        # Re-score the best candidates in float32, reading their rows in file order
+        top = np.sort(_top(scores, k * self.rescore))
+        top = top if ids is None else ids[top]
+        exact = self.score(top, query)
+        best = _top(exact, k)
+        return top[best], exact[best]
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the vectors with the highest inner product with a query.
+
+        Returns:
+            tuple: Up to `k` vector positions, best first, and their scores.
+        """
+        return self._select(None, query, k)
+
+
+class IVFIndex(ExactIndex):
+    """
+    Inverted-file index: vectors are clustered by spherical k-means into `n_lists` lists, and a
+    query only scans the vectors of the `n_probe` lists whose centroids are closest to it.
+
+    Recall and latency are traded with `n_probe` (at query time) and `n_lists` (at build time):
+    scanning n_probe / n_lists of the vectors typically finds most of the exact top k when the
+    data is clustered. Lists are stored as one permutation of the vector positions grouped by
+    list (`order`) with `offsets` marking where each list starts.
+    """
+
+    def __init__(self, vectors: np.ndarray, centroids: np.ndarray, order: np.ndarray, offsets: np.ndarray,
+                 n_probe: int = ANN_PROBE):
+        super().__init__(vectors)
+        self.centroids = centroids
+        self.order = order
+        self.offsets = offsets
+        self.n_probe = n_probe
+
+    @property
+    def n_lists(self) -> int:
+        return len(self.centroids)
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, n_lists: int = ANN_LISTS, n_probe: int = ANN_PROBE, iterations: int = 10,
+              sample_size: int = 64, seed: int = 0) -> 'IVFIndex':
+        """
+        Cluster the vectors and build the inverted lists.
+
+        Args:
+            vectors (np.ndarray): One vector per row, float32.
+            n_lists (int): Number of lists, 0 for about 4 * sqrt(number of vectors).
+            n_probe (int): Default number of lists scanned per query.
+            iterations (int): k-means iterations.
+            sample_size (int): The centroids are trained on at most this many vectors per list.
+            seed (int): Seed of the sampling and of the initial centroids.
+
+        Returns:
+            IVFIndex: The index.
+        """
+        count = len(vectors)
+        n_lists = min(n_lists or max(int(4 * np.sqrt(count)), 1), count) if count else 1
+        rng = np.random.default_rng(seed)
+        sample = np.asarray(vectors[np.sort(rng.choice(count, min(count, n_lists * sample_size), replace=False))]
+                            if count else vectors, dtype=np.float32)
+        centroids = sample[rng.choice(len(sample), n_lists, replace=False)] if count else \
+            np.zeros((1, vectors.shape[1]), dtype=np.float32)
+
+        for _ in range(iterations if count else 0):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            # Empty lists keep their centroid
+            empty = ~np.bincount(assignment, minlength=n_lists).astype(bool)
+            sums[empty] = centroids[empty]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            centroids = (sums / np.where(norms == 0, 1.0, norms)).astype(np.float32)
+
+        # Assign every vector in chunks, so the score matrix stays small
+        assignment = np.empty(count, dtype=np.int64)
+        for start in range(0, count, 8192):
+            chunk = np.asarray(vectors[start:start + 8192], dtype=np.float32)
+            assignment[start:start + 8192] = np.argmax(chunk @ centroids.T, axis=1)
+        order = np.argsort(assignment, kind='stable')
+        offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignment, minlength=n_lists), out=offsets[1:])
+        return cls(vectors, centroids, order, offsets, n_probe)
+
+    def search(self, query: np.ndarray, k: int, n_probe: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find approximately the vectors with the highest inner product with a query.
+
+        Args:
+            query (np.ndarray): The query vector.
+            k (int): Number of results.
+            n_probe (int, optional): Number of lists to scan, by default the index's `n_probe`.
+
+        Returns:
+            tuple: Up to `k` vector positions, best first, and their scores.
+        """
+        lists = _top(self.centroids @ query, min(n_probe or self.n_probe, self.n_lists))
+        candidates = np.concatenate([self.order[self.offsets[l]:self.offsets[l + 1]] for l in lists])
+        # Reading the candidates in file order keeps memory-mapped reads sequential
+        candidates.sort()
+        return self._select(candidates, query, k)
+
+    def save(self, path: str, key: str):
+        """Save the lists and centroids (not the vectors), tagged with the `key` of the vectors they index."""
+        temp_path = path + '.tmp.npz'
+        np.savez(temp_path, centroids=self.centroids, order=self.order, offsets=self.offsets, key=np.array(key))
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str, vectors: np.ndarray, key: str, n_probe: int = ANN_PROBE) -> Optional['IVFIndex']:
+        """Load an index saved by `save` for the same vectors, or return None if it is missing or stale."""
+        try:
+            with np.load(path) as saved:
+                if str(saved['key']) != key or saved['order'].shape[0] != len(vectors):
+                    return None
+                return cls(vectors, saved['centroids'], saved['order'], saved['offsets'], n_probe)
+        except (FileNotFoundError, ValueError, KeyError, OSError):
+            return None
+
+
+def create_vector_index(vectors: np.ndarray, mode: str = ANN_MODE, cache_path: Optional[str] = None,
+                        key: Optional[str] = None, dtype: str = VECTOR_DTYPE) -> ExactIndex:
+    """
+    Create the vector index selected by `RENTAL_ANN`, searching vectors of the dtype selected by `RENTAL_VECTOR_DTYPE`.
+
+    Args:
+        vectors (np.ndarray): One vector per row, float32.
+        mode (str): 'auto', 'exact' or 'ivf'.
+        cache_path (str, optional): File to load the IVF lists from, or to save them to once built.
+        key (str, optional): Identifies the vectors (e.g. the corpus hash), so a saved index is only reused for them.
+        dtype (str): 'float32', 'float16' or 'int8', see `ExactIndex.quantize`.
+
+    Raises:
+        ValueError: If the mode or the dtype is unknown.
+    """
+    if mode not in ('auto', 'exact', 'ivf'):
+        raise ValueError(f"Unknown vector search mode '{mode}'. Valid modes are 'auto', 'exact' and 'ivf'.")
+    if mode == 'exact' or mode == 'auto' and len(vectors) < ANN_MIN_SIZE:
+        return ExactIndex(vectors).quantize(dtype)
+    if cache_path is not None and key is not None:
+        index = IVFIndex.load(cache_path, vectors, key)
+        if index is not None:
+            return index.quantize(dtype)
+    index = IVFIndex.build(vectors)
+    if cache_path is not None and key is not None:
+        index.save(cache_path, key)
+    return index.quantize(dtype)
+
+
+def recall_at_k(index: ExactIndex, exact: ExactIndex, queries: np.ndarray, k: int, **search_args) -> float:
+    """Return the mean fraction of the exact top `k` that `index` finds, over a set of queries."""
+    found = 0
+    for query in queries:
+        expected = set(exact.search(query, k)[0].tolist())
+        found += len(expected & set(index.search(query, k, **search_args)[0].tolist()))
+    return found / (k * len(queries))
+
+
+def _clustered_vectors(count: int, dimension: int, clusters: int, rng) -> np.ndarray:
+    # Unit vectors scattered around random topics, like embeddings of a corpus with a few hundred themes
+    topics = rng.standard_normal((clusters, dimension)).astype(np.float32)
+    vectors = topics[rng.integers(0, clusters, count)] + 0.6 * rng.standard_normal((count, dimension)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _report(name: str, index: ExactIndex, exact: ExactIndex, queries: np.ndarray, k: int, **search_args):
+    start = time.perf_counter()
+    for query in queries:
+        index.search(query, k, **search_args)
+    latency = (time.perf_counter() - start) / len(queries) * 1000
+    print(f"{name:<24s} recall@{k} {recall_at_k(index, exact, queries, k, **search_args):.3f}  {latency:8.3f} ms/query")
+
+
+def benchmark(vectors: np.ndarray, queries: np.ndarray, k: int = 10, n_lists: int = ANN_LISTS,
+              probes=(1, 2, 4, 8, 16, 32), dtypes=('float32',)):
+    """
+    Print recall@k and mean latency against exact float32 search: of exact search on each quantized
+    dtype (with and without float32 re-scoring), then of IVF search for several `n_probe` values.
+    """
+    exact = ExactIndex(vectors)
+    _report("exact float32", exact, exact, queries, k)
+    for dtype in dtypes:
+        if dtype == 'float32':
+            continue
+        index = ExactIndex(vectors).quantize(dtype, rescore=0)
+        print(f"{dtype}: {index.quantized.nbytes / 2 ** 20:.1f} MiB instead of {vectors.nbytes / 2 ** 20:.1f} MiB")
+        _report(f"exact {dtype}", index, exact, queries, k)
+        _report(f"exact {dtype} + rescore", index.quantize(dtype), exact, queries, k)
+
+    start = time.perf_counter()
+    index = IVFIndex.build(vectors, n_lists)
+    print(f"{len(vectors)} vectors of {vectors.shape[1]} dimensions, {index.n_lists} lists, "
+          f"built in {time.perf_counter() - start:.1f} s")
+    for dtype in dtypes:
+        index.quantize(dtype)
+        for n_probe in probes:
+            if n_probe > index.n_lists:
+                break
+            _report(f"ivf {dtype} n_probe={n_probe}", index, exact, queries, k, n_probe=n_probe)
+
+
+if __name__ == '__main__':
+    # Recall/latency benchmark of IVF and quantized search against exact search: python ann_index.py [--vectors vectors.npy]
+    parser = argparse.ArgumentParser(description=benchmark.__doc__)
+    parser.add_argument('--vectors', help="A .npy matrix to index, e.g. the policy vector store; synthetic data if omitted")
+    parser.add_argument('--size', type=int, default=200000, help="Number of synthetic vectors")
+    parser.add_argument('--dimension', type=int, default=768, help="Dimension of synthetic vectors")
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--lists', type=int, default=ANN_LISTS, help="Number of lists, 0 for about 4 * sqrt(size)")
+    parser.add_argument('--probes', default='1,2,4,8,16,32', help="Comma-separated n_probe values")
+    parser.add_argument('--dtypes', default='float32,float16,int8', help="Comma-separated vector dtypes")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    if args.vectors:
+        data = np.load(args.vectors, mmap_mode='r')
+        # Queries: perturbed copies of stored vectors
+        queries = data[rng.choice(len(data), args.queries)] + 0.05 * rng.standard_normal((args.queries, data.shape[1]))
+        queries = (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(np.float32)
+    else:
+        # Queries are drawn from the same topics as the data
+        data = _clustered_vectors(args.size + args.queries, args.dimension, 500, rng)
+        data, queries = data[:args.size], data[args.size:]
+    benchmark(data, queries, args.k, args.lists, [int(probe) for probe in args.probes.split(',')],
+              args.dtypes.split(','))
@@ -8,29 +8,37 @@ from core import *
 
 
 
-user_id_file_path = os.getenv('USER_ID_FILE')
-
 # Default user info
 user_name = "Guest"
 
-if user_id_file_path and os.path.exists(user_id_file_path):
-    with open(user_id_file_path, 'r') as file:
-        user_id = file.read().strip()
-else:
-    user_id = 101
-
 thread_id = str(uuid.uuid4())
-user_info = users_df[users_df['user_id'] == int(user_id)]
-user_info = user_info.to_dict(orient='records')[0]
-config = {
-    "configurable": {
-        "user_info": user_info,
-        # Checkpoints are accessed by thread_id
-        "thread_id": thread_id,
-    }
-}
-print(thread_id)
-print(user_info)
+_config = None
+
+
+def get_config() -> dict:
+    """Return the graph config of this conversation, reading the user's record on first use."""
+    global _config
+    if _config is None:
+        user_id_file_path = os.getenv('USER_ID_FILE')
+        if user_id_file_path and os.path.exists(user_id_file_path):
+            with open(user_id_file_path, 'r') as file:
+                user_id = file.read().strip()
+        else:
+            user_id = 101
+
+        users_df = user_store.data()
+        user_info = users_df[users_df['user_id'] == int(user_id)]
+        user_info = user_info.to_dict(orient='records')[0]
+        _config = {
+            "configurable": {
+                "user_info": user_info,
+                # Checkpoints are accessed by thread_id
+                "thread_id": thread_id,
+            }
+        }
+        print(thread_id)
+        print(user_info)
+    return _config
 
 chat_history = []
 def chatloop(prompt):
@@ -41,8 +49,8 @@ def chatloop(prompt):
     while retry_count < max_retries:
 
         try:
-            all_msg = part_1_graph.invoke(
-                {"messages": ("user", prompt)}, config
+            all_msg = runtime.graph.invoke(
+                {"messages": ("user", prompt)}, get_config()
             )
             msg = all_msg.get('messages')[-1]
             if msg == "Can you clarify your request please!":
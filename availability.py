@@ -0,0 +1,358 @@
+import os
+from bisect import bisect_left, bisect_right
+from datetime import date
+import numpy as np
+import pandas as pd
+from dates import ordinal_column, to_ordinal
+
+# Booking statuses
+STATUS_CANCELLED = 0
+STATUS_PENDING = 1
+STATUS_CONFIRMED = 2
+
+# Length in days of the rolling availability calendar, starting today
+CALENDAR_DAYS = int(os.getenv('RENTAL_CALENDAR_DAYS', '365'))
+
+
+class CarIntervals:
+    """
+    Confirmed bookings of one car as intervals of day ordinals, sorted by start day.
+
+    `max_ends[i]` holds the latest end day among the first i + 1 intervals, so an overlap
+    query only needs one binary search: the intervals that start on or before the requested
+    end day are a prefix of the list, and one of them overlaps iff the prefix's latest end
+    day is on or after the requested start day.
+    """
+
+    __slots__ = ('starts', 'ends', 'booking_ids', 'max_ends')
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+        self.booking_ids = []
+        self.max_ends = []
+
+    def __len__(self):
+        return len(self.starts)
+
+    def _recompute_max_ends(self, position: int):
+        del self.max_ends[position:]
+        running = self.max_ends[-1] if self.max_ends else None
+        for end in self.ends[position:]:
+            running = end if running is None or end > running else running
+            self.max_ends.append(running)
+
+    def add(self, booking_id: int, start: int, end: int):
+        position = bisect_right(self.starts, start)
+        self.starts.insert(position, start)
+        self.ends.insert(position, end)
+        self.booking_ids.insert(position, booking_id)
+        self._recompute_max_ends(position)
+
+    def remove(self, booking_id: int, start: int) -> bool:
+        position = bisect_left(self.starts, start)
+        while position < len(self.starts) and self.starts[position] == start:
+            if self.booking_ids[position] == booking_id:
+                del self.starts[position]
+                del self.ends[position]
+                del self.booking_ids[position]
+                self._recompute_max_ends(position)
+                return True
+            position += 1
+        return False
+
+    def overlaps(self, start: int, end: int, exclude_booking_id=None) -> bool:
+        position = bisect_right(self.starts, end)
+        if position == 0 or self.max_ends[position - 1] < start:
+            return False
+        if exclude_booking_id is None:
+            return True
+        # max_ends is non-decreasing, so only intervals from the first one whose prefix reaches `start`
+        # can overlap, and that first one does; scanning on is only needed when it is the excluded booking
+        lower = bisect_left(self.max_ends, start, 0, position)
+        return any(self.ends[i] >= start and self.booking_ids[i] != exclude_booking_id
+                   for i in range(lower, position))
+
+    def free_gaps(self, first: int, last: int):
+        """Yield the maximal runs of free days (start, end) within [first, last]."""
+        position = bisect_left(self.starts, first)
+        # Intervals starting before `first` may still cover its first days
+        cursor = max(first, self.max_ends[position - 1] + 1) if position else first
+        for i in range(position, len(self.starts)):
+            if self.starts[i] > last:
+                break
+            if self.starts[i] > cursor:
+                yield cursor, self.starts[i] - 1
+            cursor = max(cursor, self.ends[i] + 1)
+        if cursor <= last:
+            yield cursor, last
+
+
+class AvailabilityCalendar:
+    """
+    Day-by-day occupancy of every booked car over a rolling horizon of `days` days from `origin`.
+
+    Each car has one row with a counter per day (the number of confirmed bookings covering
+    that day), so "is car X free from A to B" is a test on one slice of its row, and "which cars
+    are free from A to B" is one vectorized reduction over the fleet's rows. Counters rather
+    than single bits let overlapping bookings be removed independently.
+    """
+
+    def __init__(self, origin: int, days: int = CALENDAR_DAYS):
+        self.origin = origin
+        self.days = days
+        self._rows = {}
+        self._car_ids = np.zeros(0, dtype='int64')
+        self._counts = np.zeros((0, days), dtype='uint16')
+
+    @classmethod
+    def from_intervals(cls, car_ids, starts, ends, origin: int, days: int = CALENDAR_DAYS) -> 'AvailabilityCalendar':
+        """
+        Build the calendar from parallel arrays of confirmed bookings (car IDs, start and end day ordinals).
+        """
+        calendar = cls(origin, days)
+        car_ids, starts, ends = np.asarray(car_ids), np.asarray(starts, dtype='int64'), np.asarray(ends, dtype='int64')
+        inside = (ends >= origin) & (starts < origin + days)
+        car_ids, starts, ends = car_ids[inside], starts[inside] - origin, ends[inside] - origin
+        unique_ids, rows = np.unique(car_ids, return_inverse=True)
+        calendar._car_ids = unique_ids.astype('int64')
+        calendar._rows = dict(zip(unique_ids.tolist(), range(len(unique_ids))))
+        # Difference array: +1 on the first day of each booking, -1 after its last day, then a running sum
+        deltas = np.zeros((len(unique_ids), days + 1), dtype='int32')
+        np.add.at(deltas, (rows, np.clip(starts, 0, days)), 1)
+        np.add.at(deltas, (rows, np.clip(ends + 1, 0, days)), -1)
+        calendar._counts = np.cumsum(deltas, axis=1)[:, :days].astype('uint16')
+        return calendar
+
+    def covers(self, start: int, end: int) -> bool:
+        """Check if a period of day ordinals lies within the horizon."""
+        return self.origin <= start <= end < self.origin + self.days
+
+    def _row(self, car_id) -> int:
+        row = self._rows.get(car_id)
+        if row is None:
+            row = len(self._car_ids)
+            self._rows[car_id] = row
+            self._car_ids = np.append(self._car_ids, car_id)
+            self._counts = np.vstack([self._counts, np.zeros((1, self.days), dtype='uint16')])
+        return row
+
+    def _clip(self, start: int, end: int):
+        return max(start - self.origin, 0), min(end - self.origin, self.days - 1) + 1
+
+    def add(self, car_id, start: int, end: int):
+        """Mark the days of a confirmed booking (day ordinals) as taken."""
+        first, stop = self._clip(start, end)
+        if first < stop:
+            self._counts[self._row(car_id), first:stop] += 1
+
+    def remove(self, car_id, start: int, end: int):
+        """Release the days of a booking previously passed to `add()`."""
+        first, stop = self._clip(start, end)
+        row = self._rows.get(car_id)
+        if first < stop and row is not None:
+            self._counts[row, first:stop] -= 1
+
+    def is_available(self, car_id, start: int, end: int) -> bool:
+        """Check if a car is free on every day of a period within the horizon."""
+        row = self._rows.get(car_id)
+        return row is None or not self._counts[row, start - self.origin:end - self.origin + 1].any()
+
+    def blocked_cars(self, start: int, end: int) -> np.ndarray:
+        """Return the IDs of the cars taken on at least one day of a period within the horizon."""
+        return self._car_ids[self._counts[:, start - self.origin:end - self.origin + 1].any(axis=1)]
+
+
+class AvailabilityIndex:
+    """
+    Per-car index of confirmed bookings used to answer availability questions.
+
+    A car is unavailable for [start, end] if one of its confirmed bookings overlaps the
+    period, both ends included. Queries cost O(log n) in the number of bookings of the car.
+    The index is kept up to date by feeding every changed booking row to `sync()`.
+
+    Fleet-wide questions ("which cars are blocked for this period?") are answered with one
+    vectorized overlap mask over flat NumPy arrays of all confirmed bookings. The arrays are
+    rebuilt lazily after a change.
+
+    Periods within the next `CALENDAR_DAYS` days, which is what customers ask about, are
+    answered from an `AvailabilityCalendar` instead. It is built on first use, updated with
+    every added or removed booking, and rebuilt when the day changes.
+    """
+
+    def __init__(self):
+        self._cars = {}
+        self._bookings = {}
+        self._flat = None
+        self._calendar = None
+
+    @classmethod
+    def from_bookings(cls, bookings_df: pd.DataFrame) -> 'AvailabilityIndex':
+        """
+        Build the index from a bookings table.
+
+        Args:
+            bookings_df (pd.DataFrame): Table with `booking_id`, `car_id`, `start_date`, `end_date` (typed or
+                dd/mm/YYYY strings) and `booking_status`.
+
+        Returns:
+            AvailabilityIndex: The populated index.
+        """
+        index = cls()
+        if bookings_df.empty:
+            return index
+        confirmed = bookings_df[bookings_df['booking_status'] == STATUS_CONFIRMED]
+        starts = ordinal_column(confirmed['start_date'])
+        ends = ordinal_column(confirmed['end_date'])
+        rows = pd.DataFrame({
+            'booking_id': confirmed['booking_id'].to_numpy(),
+            'car_id': confirmed['car_id'].to_numpy(),
+            'start': starts.to_numpy(),
+            'end': ends.to_numpy(),
+        })
+        rows = rows[(rows['start'] >= 0) & (rows['end'] >= 0)].sort_values('start', kind='stable')
+        for car_id, group in rows.groupby('car_id', sort=False):
+            intervals = CarIntervals()
+            intervals.starts = group['start'].tolist()
+            intervals.ends = group['end'].tolist()
+            intervals.booking_ids = group['booking_id'].tolist()
+            intervals._recompute_max_ends(0)
+            index._cars[car_id] = intervals
+            for booking_id, start, end in zip(intervals.booking_ids, intervals.starts, intervals.ends):
+                index._bookings[booking_id] = (car_id, start, end)
+        index._flat = (rows['car_id'].to_numpy(), rows['start'].to_numpy(), rows['end'].to_numpy())
+        return index
+
+    def add(self, booking_id: int, car_id: int, start, end):
+        """Record a confirmed booking, replacing any previous entry with the same ID."""
+        self.remove(booking_id)
+        start, end = to_ordinal(start), to_ordinal(end)
+        self._cars.setdefault(car_id, CarIntervals()).add(booking_id, start, end)
+        self._bookings[booking_id] = (car_id, start, end)
+        self._flat = None
+        if self._calendar is not None:
+            self._calendar.add(car_id, start, end)
+
+    def remove(self, booking_id: int):
+        """Forget a booking. Unknown IDs are ignored."""
+        entry = self._bookings.pop(booking_id, None)
+        if entry is not None:
+            car_id, start, end = entry
+            self._cars[car_id].remove(booking_id, start)
+            self._flat = None
+            if self._calendar is not None:
+                self._calendar.remove(car_id, start, end)
+
+    def sync(self, booking: dict):
+        """
+        Apply the current state of a booking row to the index.
+
+        Confirmed bookings are (re)inserted with their current dates; any other status removes them.
+        """
+        if booking['booking_status'] == STATUS_CONFIRMED:
+            self.add(booking['booking_id'], booking['car_id'], booking['start_date'], booking['end_date'])
+        else:
+            self.remove(booking['booking_id'])
+
+    def is_available(self, car_id: int, start_date, end_date, exclude_booking_id=None) -> bool:
+        """
+        Check if a car has no confirmed booking overlapping the given period.
+
+        Args:
+            car_id (int): ID of the car to check.
+            start_date: Start of the period (date, datetime, ordinal or dd/mm/YYYY string).
+            end_date: End of the period (date, datetime, ordinal or dd/mm/YYYY string).
+            exclude_booking_id (int, optional): Booking to ignore, e.g. the one being moved to new dates.
+
+        Returns:
+            bool: True if the car is available, False otherwise.
+        """
+        intervals = self._cars.get(car_id)
+        if not intervals:
+            return True
+        start, end = to_ordinal(start_date), to_ordinal(end_date)
+        if exclude_booking_id is None:
+            calendar = self.calendar()
+            if calendar.covers(start, end):
+                return calendar.is_available(car_id, start, end)
+        return not intervals.overlaps(start, end, exclude_booking_id)
+
+    def free_windows(self, car_id: int, start_date, end_date, count: int = 3, within_days: int = 60) -> list:
+        """
+        Find the free periods of a car with the same length as a requested one, nearest first.
+
+        Args:
+            car_id (int): ID of the car.
+            start_date: Requested start (date, datetime, ordinal or dd/mm/YYYY string).
+            end_date: Requested end (date, datetime, ordinal or dd/mm/YYYY string).
+            count (int): Maximum number of periods to return.
+            within_days (int): How far before and after the requested period to look. Periods never start before today.
+
+        Returns:
+            list: (start, end) day ordinal pairs, ordered by distance of their start to the requested start.
+        """
+        start, end = to_ordinal(start_date), to_ordinal(end_date)
+        length = end - start + 1
+        first, last = max(start - within_days, date.today().toordinal()), end + within_days
+        intervals = self._cars.get(car_id)
+        gaps = intervals.free_gaps(first, last) if intervals else [(first, last)]
+        windows = []
+        for gap_start, gap_end in gaps:
+            if gap_end - gap_start + 1 >= length:
+                # The window of this gap closest to the requested start
+                window_start = min(max(start, gap_start), gap_end - length + 1)
+                windows.append((window_start, window_start + length - 1))
+        windows.sort(key=lambda window: (abs(window[0] - start), window[0]))
+        return windows[:count]
+
+    def calendar(self) -> AvailabilityCalendar:
+        """
+        Return the day-by-day calendar starting today, building or rolling it forward if needed.
+        """
+        today = date.today().toordinal()
+        if self._calendar is None or self._calendar.origin != today:
+            self._calendar = AvailabilityCalendar.from_intervals(*self._flat_arrays(), origin=today)
+        return self._calendar
+
+    def _flat_arrays(self):
+        if self._flat is None:
+            entries = list(self._bookings.values())
+            if entries:
+                car_ids, starts, ends = (np.array(column) for column in zip(*entries))
+            else:
+                car_ids, starts, ends = np.array([]), np.array([], dtype='int64'), np.array([], dtype='int64')
+            self._flat = (car_ids, starts, ends)
+        return self._flat
+
+    def blocked_cars(self, start_date, end_date) -> np.ndarray:
+        """
+        Find every car with a confirmed booking overlapping the given period.
+
+        Args:
+            start_date: Start of the period (date, datetime, ordinal or dd/mm/YYYY string).
+            end_date: End of the period (date, datetime, ordinal or dd/mm/YYYY string).
+
+        Returns:
+            np.ndarray: The unique IDs of the unavailable cars.
+        """
+        start, end = to_ordinal(start_date), to_ordinal(end_date)
+        calendar = self.calendar()
+        if calendar.covers(start, end):
+            return calendar.blocked_cars(start, end)
+        car_ids, starts, ends = self._flat_arrays()
+        overlapping = (starts <= end) & (ends >= start)
+        return np.unique(car_ids[overlapping])
+
+    def available_mask(self, car_ids, start_date, end_date) -> np.ndarray:
+        """
+        Check the availability of many cars at once.
+
+        Args:
+            car_ids: Sequence (list, array or Series) of car IDs.
+            start_date: Start of the period.
+            end_date: End of the period.
+
+        Returns:
+            np.ndarray: Boolean array aligned with `car_ids`, True where the car is available.
+        """
+        return ~np.isin(np.asarray(car_ids), self.blocked_cars(start_date, end_date))
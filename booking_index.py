@@ -0,0 +1,122 @@
+from bisect import bisect_left, insort
+from heapq import merge
+from itertools import islice
+from typing import Optional, Tuple
+import pandas as pd
+from dates import ordinal_column, to_ordinal
+
+
+def encode_cursor(key: Tuple[int, int]) -> str:
+    """Encode the (start day ordinal, booking ID) of the last booking of a page as a cursor string."""
+    return f"{key[0]}.{key[1]}"
+
+
+def decode_cursor(cursor: str) -> Tuple[int, int]:
+    """
+    Decode a cursor returned by `encode_cursor`.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        start, booking_id = cursor.split('.')
+        return int(start), int(booking_id)
+    except (AttributeError, ValueError):
+        raise ValueError(f"Invalid cursor '{cursor}'.")
+
+
+def _start_ordinal(value) -> int:
+    return -1 if value is None or pd.isna(value) else to_ordinal(value)
+
+
+class UserBookingIndex:
+    """
+    Bookings of every user, partitioned by booking status.
+
+    Each partition is a list of (start day ordinal, booking ID) keys kept sorted, so that
+    "which bookings of this user have one of these statuses?" costs O(user's bookings), and
+    a page of them by start date costs O(log(user's bookings) + page size) wherever it starts.
+    The index is kept up to date by feeding every changed booking row to `sync()`.
+    """
+
+    def __init__(self):
+        self._users = {}
+        self._bookings = {}
+
+    @classmethod
+    def from_bookings(cls, bookings_df: pd.DataFrame) -> 'UserBookingIndex':
+        """
+        Build the index from a bookings table with `booking_id`, `user_id`, `start_date` and `booking_status` columns.
+        """
+        index = cls()
+        if bookings_df.empty:
+            return index
+        rows = pd.DataFrame({
+            'start': ordinal_column(bookings_df['start_date']).to_numpy(),
+            'booking_id': bookings_df['booking_id'].to_numpy(),
+            'user_id': bookings_df['user_id'].to_numpy(),
+            'status': bookings_df['booking_status'].to_numpy(),
+        }).sort_values(['start', 'booking_id'])
+        # Appending in key order keeps every partition sorted without insort
+        for start, booking_id, user_id, status in zip(rows['start'].tolist(), rows['booking_id'].tolist(),
+                                                      rows['user_id'].tolist(), rows['status'].tolist()):
+            index._users.setdefault(user_id, {}).setdefault(status, []).append((start, booking_id))
+            index._bookings[booking_id] = (user_id, status, start)
+        return index
+
+    def _add(self, booking_id: int, user_id: int, status: int, start: int):
+        insort(self._users.setdefault(user_id, {}).setdefault(status, []), (start, booking_id))
+        self._bookings[booking_id] = (user_id, status, start)
+
+    def remove(self, booking_id: int):
+        """Forget a booking. Unknown IDs are ignored."""
+        entry = self._bookings.pop(booking_id, None)
+        if entry is not None:
+            user_id, status, start = entry
+            keys = self._users[user_id][status]
+            del keys[bisect_left(keys, (start, booking_id))]
+
+    def sync(self, booking: dict):
+        """Apply the current user, status and start date of a booking row to the index."""
+        entry = (booking['user_id'], booking['booking_status'], _start_ordinal(booking['start_date']))
+        if self._bookings.get(booking['booking_id']) != entry:
+            self.remove(booking['booking_id'])
+            self._add(booking['booking_id'], *entry)
+
+    def booking_ids(self, user_id: int, statuses) -> list:
+        """
+        Find the bookings of a user that have one of the given statuses.
+
+        Args:
+            user_id (int): ID of the user.
+            statuses: Booking statuses to include.
+
+        Returns:
+            list: The booking IDs, in ascending order.
+        """
+        partitions = self._users.get(user_id, {})
+        return sorted(booking_id for status in statuses for _, booking_id in partitions.get(status, ()))
+
+    def page(self, user_id: int, statuses, page_size: int, cursor: Optional[str] = None) -> Tuple[list, Optional[str]]:
+        """
+        Return one page of a user's bookings with the given statuses, latest start date first.
+
+        Args:
+            user_id (int): ID of the user.
+            statuses: Booking statuses to include.
+            page_size (int): Maximum number of bookings in the page.
+            cursor (str, optional): Cursor returned with the previous page, None for the first page.
+
+        Returns:
+            tuple: The booking IDs of the page, and the cursor of the next page (None on the last page).
+        """
+        after = decode_cursor(cursor) if cursor is not None else None
+        partitions = self._users.get(user_id, {})
+        descending = []
+        for status in statuses:
+            keys = partitions.get(status, [])
+            position = bisect_left(keys, after) if after is not None else len(keys)
+            descending.append(map(keys.__getitem__, range(position - 1, -1, -1)))
+        keys = list(islice(merge(*descending, reverse=True), page_size + 1))
+        next_cursor = encode_cursor(keys[page_size - 1]) if len(keys) > page_size else None
+        return [booking_id for _, booking_id in keys[:page_size]], next_cursor
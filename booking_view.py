@@ -0,0 +1,84 @@
+import threading
+import pandas as pd
+
+
+class BookingView:
+    """
+    Bookings joined with the attributes of their car, as `pd.merge(bookings_df, cars_df, on='car_id')` would.
+
+    Joined rows are materialized per booking the first time they are read and kept up to date
+    incrementally: the view listens to row changes of both stores, so a changed booking updates
+    its own row and a changed car updates the rows of its bookings. When either table is replaced
+    as a whole (its `generation` changes), the view starts over.
+
+    Lock order is bookings store, then fleet store, then the view; listeners are called with a
+    store lock held and only take the view's lock.
+    """
+
+    def __init__(self, bookings, fleet):
+        self.bookings = bookings
+        self.fleet = fleet
+        self._lock = threading.RLock()
+        self._records = {}
+        self._by_car = {}
+        self._columns = None
+        self._stamp = None
+        bookings.add_listener(self._booking_changed)
+        fleet.add_listener(self._car_changed)
+
+    def _booking_changed(self, booking: dict):
+        with self._lock:
+            record = self._records.get(booking['booking_id'])
+            if record is None:
+                return
+            if record['car_id'] != booking['car_id']:
+                self._by_car[record['car_id']].discard(booking['booking_id'])
+                del self._records[booking['booking_id']]
+            else:
+                record.update(booking)
+
+    def _car_changed(self, car: dict):
+        with self._lock:
+            attributes = {column: value for column, value in car.items() if column != 'car_id'}
+            for booking_id in self._by_car.get(car['car_id'], ()):
+                self._records[booking_id].update(attributes)
+
+    def _materialize(self, booking_ids: list):
+        bookings = self.bookings.rows(booking_ids).to_dict(orient='records')
+        car_ids = list(dict.fromkeys(booking['car_id'] for booking in bookings))
+        cars = {car['car_id']: car for car in self.fleet.rows(car_ids).to_dict(orient='records')}
+        for booking in bookings:
+            car = cars.get(booking['car_id'])
+            # Bookings of unknown cars are left out, as with an inner merge
+            if car is not None:
+                self._records[booking['booking_id']] = {**booking, **car}
+                self._by_car.setdefault(booking['car_id'], set()).add(booking['booking_id'])
+
+    def rows(self, booking_ids) -> pd.DataFrame:
+        """
+        Retrieve bookings with their car's columns.
+
+        Args:
+            booking_ids: Sequence of booking IDs.
+
+        Returns:
+            pd.DataFrame: The joined rows in the order of `booking_ids`. Unknown bookings, and bookings
+                of unknown cars, are left out.
+        """
+        booking_ids = list(booking_ids)
+        with self.bookings._lock, self.fleet._lock:
+            self.bookings.refresh()
+            self.fleet.refresh()
+            stamp = (self.bookings.generation, self.fleet.generation)
+            with self._lock:
+                if stamp != self._stamp:
+                    self._records, self._by_car = {}, {}
+                    booking_columns = list(self.bookings.data().columns)
+                    self._columns = booking_columns + [
+                        column for column in self.fleet.data().columns if column not in booking_columns]
+                    self._stamp = stamp
+                missing = [booking_id for booking_id in dict.fromkeys(booking_ids) if booking_id not in self._records]
+                if missing:
+                    self._materialize(missing)
+                records = [self._records[booking_id] for booking_id in booking_ids if booking_id in self._records]
+                return pd.DataFrame(records, columns=self._columns)
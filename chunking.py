@@ -0,0 +1,120 @@
+import os
+import re
+from typing import List, Optional
+
+# Longest chunk, in characters, and how many characters of a split section are repeated at the start of the next part
+MAX_CHARS = int(os.getenv('RENTAL_CHUNK_MAX_CHARS', '1000'))
+OVERLAP = int(os.getenv('RENTAL_CHUNK_OVERLAP', '150'))
+
+_HEADING = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+# A line that is bold as a whole, e.g. "**What happens if I return the car late?**", opens an FAQ entry
+_ENTRY = re.compile(r'^\*\*(.+?)\*\*\s*$')
+# Boundaries to split long text at, coarsest first; the captured separator stays with the piece before it
+_SEPARATORS = (re.compile(r'(\n\s*\n)'), re.compile(r'(\n)'), re.compile(r'(?<=[.!?])(\s+)'), re.compile(r'(\s+)'))
+
+
+def _plain(title: str) -> str:
+    # Heading text without Markdown emphasis
+    return re.sub(r'[*_`]+', '', title).strip()
+
+
+def _pieces(text: str, max_chars: int, level: int = 0) -> List[str]:
+    # Split a text into pieces of at most max_chars, at paragraph, then line, then sentence, then word
+    # boundaries. The pieces keep their separators, so joining them gives back the text.
+    if len(text) <= max_chars:
+        return [text]
+    for position in range(level, len(_SEPARATORS)):
+        fields = _SEPARATORS[position].split(text)
+        parts = []
+        for start in range(0, len(fields), 2):
+            part = ''.join(fields[start:start + 2])
+            if parts and not fields[start]:
+                parts[-1] += part
+            else:
+                parts.append(part)
+        if len(parts) > 1:
+            return [piece for part in parts for piece in _pieces(part, max_chars, position)]
+    return [text[i:i + max_chars] for i in range(0, len(text), max_chars)]
+
+
+def _overlap_tail(text: str, overlap: int) -> str:
+    # The last `overlap` characters of a text, starting on a word boundary
+    if overlap <= 0:
+        return ''
+    if len(text) <= overlap:
+        return text
+    tail = text[-overlap:]
+    space = re.search(r'\s+', tail)
+    return tail[space.end():] if space and space.end() < len(tail) else tail
+
+
+def _split(heading_line: str, body: str, max_chars: int, overlap: int) -> List[str]:
+    # Pack the body into parts that fit max_chars with the heading line in front of each one
+    budget = max(max_chars - len(heading_line) - 1, 1)
+    parts, current = [], ''
+    for piece in _pieces(body, max(budget - overlap, 1)):
+        if current.strip() and len(current) + len(piece) > budget:
+            parts.append(current)
+            current = _overlap_tail(current, overlap)
+        current += piece
+    parts.append(current)
+    return [f"{heading_line}\n{part}" if heading_line else part for part in parts]
+
+
+def chunk_markdown(text: str, max_chars: int = MAX_CHARS, overlap: int = OVERLAP) -> List[dict]:
+    """
+    Split a Markdown document into small retrieval chunks along its structure.
+
+    Every heading (#, ##, ###, ...) starts a section, and inside a section every line that is
+    bold as a whole (an FAQ question) starts an entry of its own. Sections and entries longer
+    than `max_chars` are split at paragraph, line, sentence or word boundaries, each part
+    starting with the heading line and the last `overlap` characters of the previous part.
+    Parts keep the separators of the source, so without overlap their texts after the heading
+    line join back into the section text.
+    Headings without text of their own produce no chunk.
+
+    Args:
+        text (str): The Markdown document.
+        max_chars (int): Longest chunk, in characters.
+        overlap (int): Characters of a split section repeated at the start of the next part.
+
+    Returns:
+        list: Chunks as dicts with `page_content`, `heading` (title of the section or FAQ question),
+            `parent_heading` (title of the enclosing section, or None) and `part` (0 unless the
+            section was split).
+    """
+    units = []
+    titles = []
+
+    def add_unit(heading_line: Optional[str], heading: Optional[str], parent: Optional[str], lines: List[str]):
+        body = '\n'.join(lines).strip()
+        if body:
+            units.append((heading_line or '', heading, parent, body))
+
+    def add_section(heading_line: Optional[str], lines: List[str]):
+        heading = titles[-1][1] if titles else None
+        parent = titles[-2][1] if len(titles) > 1 else None
+        entries = [position for position, line in enumerate(lines) if _ENTRY.match(line)]
+        add_unit(heading_line, heading, parent, lines[:entries[0]] if entries else lines)
+        for start, end in zip(entries, entries[1:] + [len(lines)]):
+            add_unit(lines[start].strip(), _plain(_ENTRY.match(lines[start]).group(1)), heading, lines[start + 1:end])
+
+    heading_line, lines = None, []
+    for line in text.splitlines():
+        match = _HEADING.match(line)
+        if match is None:
+            lines.append(line)
+            continue
+        add_section(heading_line, lines)
+        level = len(match.group(1))
+        while titles and titles[-1][0] >= level:
+            titles.pop()
+        titles.append((level, _plain(match.group(2))))
+        heading_line, lines = line.strip(), []
+    add_section(heading_line, lines)
+
+    chunks = []
+    for heading_line, heading, parent, body in units:
+        for part, content in enumerate(_split(heading_line, body, max_chars, overlap)):
+            chunks.append({"page_content": content, "heading": heading, "parent_heading": parent, "part": part})
+    return chunks
@@ -0,0 +1,160 @@
+import io
+import os
+import sys
+from typing import Optional, Tuple
+import pandas as pd
+from dates import BOOKING_DATE_COLUMNS, parse_date_column
+
+# Columns stored as dictionary-encoded (integer codes + a small table of distinct values)
+CATEGORICAL_COLUMNS = ('car_type', 'fuel_type', 'transmission', 'booking_status')
+
+# Schema metadata recording which prefix of which CSV file a columnar snapshot holds
+_SOURCE_INODE = b'rental.source_inode'
+_SOURCE_SIZE = b'rental.source_size'
+
+
+def columnar_path(csv_path: str) -> str:
+    """Return the path of the columnar snapshot of a CSV table (`bookings.csv` -> `bookings.arrow`)."""
+    return os.path.splitext(csv_path)[0] + '.arrow'
+
+
+def _decode(df: pd.DataFrame) -> pd.DataFrame:
+    # Text categories stay pandas categoricals; numeric ones (booking_status) go back to plain integers
+    # so that comparisons, updates and appended rows behave as with the CSV reader
+    for column in df.columns:
+        if isinstance(df[column].dtype, pd.CategoricalDtype) and not pd.api.types.is_string_dtype(
+                df[column].cat.categories):
+            df[column] = df[column].astype(df[column].cat.categories.dtype)
+    return df
+
+
+def write_table(df: pd.DataFrame, path: str, source_inode: Optional[int] = None, source_size: Optional[int] = None):
+    """
+    Write a table as an uncompressed Arrow IPC (Feather v2) file, atomically.
+
+    Uncompressed buffers can be memory-mapped by readers, so every process maps the same
+    page-cache pages instead of holding a private parsed copy.
+
+    Args:
+        df (pd.DataFrame): The table. Dates should already be datetime64 columns.
+        path (str): Destination file.
+        source_inode (int, optional): Inode of the CSV file the table was read from.
+        source_size (int, optional): Number of bytes of that CSV file the table holds.
+    """
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for position, name in enumerate(table.column_names):
+        if name in CATEGORICAL_COLUMNS and not pa.types.is_dictionary(table.schema.field(name).type):
+            table = table.set_column(position, name, table.column(name).dictionary_encode())
+    metadata = dict(table.schema.metadata or {})
+    if source_inode is not None:
+        metadata[_SOURCE_INODE] = str(source_inode).encode()
+        metadata[_SOURCE_SIZE] = str(source_size).encode()
+    table = table.replace_schema_metadata(metadata)
+    temp_path = path + '.tmp'
+    feather.write_feather(table, temp_path, compression='uncompressed')
+    os.replace(temp_path, path)
+
+
+def read_table(path: str) -> Tuple[pd.DataFrame, dict]:
+    """
+    Memory-map a columnar snapshot.
+
+    Returns:
+        tuple: The table, and the snapshot's source metadata (`inode` and `size`, empty if unknown).
+    """
+    import pyarrow as pa
+
+    with pa.memory_map(path) as source:
+        table = pa.ipc.open_file(source).read_all()
+    metadata = table.schema.metadata or {}
+    source_info = {}
+    if _SOURCE_INODE in metadata:
+        source_info = {'inode': int(metadata[_SOURCE_INODE]), 'size': int(metadata[_SOURCE_SIZE])}
+    return _decode(table.to_pandas(split_blocks=True)), source_info
+
+
+def read_csv_prefix(csv_path: str, offset: int = 0, columns=None) -> Tuple[pd.DataFrame, int, int]:
+    """
+    Parse a CSV table from a byte offset up to its last complete line.
+
+    Args:
+        csv_path (str): The CSV file.
+        offset (int): Byte offset of the first row to read. 0 reads the header too.
+        columns (list, optional): Column names, required when `offset` is past the header.
+
+    Returns:
+        tuple: The parsed rows, the file's inode and the byte offset just past the last row read.
+    """
+    with open(csv_path, 'rb') as file:
+        inode = os.fstat(file.fileno()).st_ino
+        file.seek(offset)
+        content = file.read()
+    content = content[:content.rfind(b'\n') + 1]
+    end = offset + len(content)
+    if offset == 0:
+        return pd.read_csv(io.BytesIO(content)), inode, end
+    if not content.strip():
+        return pd.DataFrame(columns=columns), inode, end
+    return pd.read_csv(io.BytesIO(content), header=None, names=columns), inode, end
+
+
+def load_table(csv_path: str) -> Optional[pd.DataFrame]:
+    """
+    Load a CSV table from its columnar snapshot, parsing only the rows appended to the CSV since.
+
+    Returns:
+        pd.DataFrame: The table (dates still as written in the CSV for the appended rows), or None if
+            there is no snapshot or it does not match the current CSV file, e.g. after a rewrite.
+    """
+    path = columnar_path(csv_path)
+    try:
+        df, source = read_table(path)
+        stat = os.stat(csv_path)
+    except (FileNotFoundError, ImportError):
+        return None
+    if source.get('inode') != stat.st_ino or source['size'] > stat.st_size:
+        return None
+    tail, inode, _ = read_csv_prefix(csv_path, source['size'], list(df.columns))
+    if inode != source['inode']:
+        return None
+    if tail.empty:
+        return df
+    for column in BOOKING_DATE_COLUMNS:
+        if column in tail.columns:
+            tail[column] = parse_date_column(tail[column])
+    df = pd.concat([df, tail], ignore_index=True)
+    for column in CATEGORICAL_COLUMNS:
+        if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype) and \
+                pd.api.types.is_string_dtype(df[column]):
+            df[column] = df[column].astype('category')
+    return df
+
+
+def convert(csv_path: str) -> str:
+    """
+    Write the columnar snapshot of a CSV table.
+
+    Args:
+        csv_path (str): The CSV file, e.g. one generated by `create_csv_files.py`.
+
+    Returns:
+        str: Path of the written snapshot.
+    """
+    df, inode, size = read_csv_prefix(csv_path)
+    for column in BOOKING_DATE_COLUMNS:
+        if column in df.columns:
+            df[column] = parse_date_column(df[column])
+    path = columnar_path(csv_path)
+    write_table(df, path, source_inode=inode, source_size=size)
+    return path
+
+
+if __name__ == '__main__':
+    # Run from the project root: python columnar.py [table.csv ...]
+    from store import BOOKINGS_FILE_PATH, CARS_FILE_PATH, USERS_FILE_PATH
+
+    for csv_file in sys.argv[1:] or [CARS_FILE_PATH, BOOKINGS_FILE_PATH, USERS_FILE_PATH]:
+        print(f"{csv_file} -> {convert(csv_file)}")
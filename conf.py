@@ -1,10 +1,14 @@
 import os
 import numpy as np
 import time
-import re
-import json
-import requests
+import threading
+from typing import Optional
 from langchain_groq import ChatGroq
+from embeddings import EmbeddingError, EmbeddingProvider, create_provider
+from lexical_index import BM25Index, reciprocal_rank_fusion
+from ann_index import ExactIndex, create_vector_index
+from vector_store import VectorStore, reindex
+from chunking import chunk_markdown
 #from langchain_anthropic import ChatAnthropic
 
 
@@ -17,6 +21,12 @@ os.environ["GROQ_API_KEY"] = "GROQ_API_KEY_HERE"
 
 # Define paths
 policy_rules_path = 'Rental-Car-Business-Demo/data/company_rules.md'
+# Policy vectors (float32 matrix + document sidecar, see vector_store.py)
+vectors_path = 'Rental-Car-Business-Demo/data/vectors.npy'
+# Policy retrieval: 'hybrid' (BM25 and vectors fused, default), 'vector' or 'lexical' (BM25 only, no embedding calls)
+retrieval_mode = os.getenv('RENTAL_RETRIEVAL', 'hybrid')
+# Seconds between checks of company_rules.md for edits, applied to the running retriever (0 disables watching)
+policy_watch_interval = float(os.getenv('RENTAL_POLICY_WATCH', '0'))
 
 
 
@@ -27,8 +37,9 @@ USERS_FILE_PATH = 'Rental-Car-Business-Demo/data/users.csv'
 # Retrieve the path to the temporary file from the environment variable
 user_id_file_path = os.getenv('USER_ID_FILE')
 
-#llm = ChatAnthropic(model="claude-3-5-sonnet-20240620", temperature=0.7)
-llm = ChatGroq(model="llama3-groq-70b-8192-tool-use-preview", temperature=0.7, max_tokens=None, timeout=None)
+def create_llm():
+    #return ChatAnthropic(model="claude-3-5-sonnet-20240620", temperature=0.7)
+    return ChatGroq(model="llama3-groq-70b-8192-tool-use-preview", temperature=0.7, max_tokens=None, timeout=None)
 
 
 
@@ -37,74 +48,220 @@ def load_policy_rules(file_path: str) -> str:
         return file.read()
 
 
+def split_policy_rules(policy_rules_text: str) -> list:
+    """
+    Split the policy rules into documents, one per `###` rule and one per FAQ entry (see chunking.py).
+
+    Each document keeps the title of its rule or question as `heading` and the section it belongs
+    to ("Company Policy Rules" or "FAQ") as `parent_heading`.
+    """
+    return chunk_markdown(policy_rules_text)
+
+
 class VectorStoreRetriever:
-    def __init__(self, docs: list, vectors: list):
-        self._arr = np.array(vectors)
-        self._docs = docs
-        self.api_url = 'https://api-inference.huggingface.co/models/jinaai/jina-embeddings-v2-base-en'
-        self.headers = {'Authorization': f'Bearer $huggingface_api_here$'}  # Replace with your API key
+    """
+    Retriever over the policy documents, ranking them by vector similarity, BM25 or both.
 
-    def get_embedding(self, text):
-        response = requests.post(self.api_url, headers=self.headers, json={"inputs": text[:2000]})
+    In 'hybrid' mode the dense ranking and the BM25 ranking of a local inverted index are merged
+    by reciprocal rank fusion. When the embedding service fails, or no vectors could be built,
+    queries are answered from the BM25 ranking alone instead of failing. Vector search is exact,
+    or approximate (IVF) for large corpora, see ann_index.py.
+    """
+
+    def __init__(self, docs: list, vectors, provider: Optional[EmbeddingProvider] = None,
+                 vectors_path: str = vectors_path, mode: str = retrieval_mode, key: Optional[str] = None):
+        if mode not in ('hybrid', 'vector', 'lexical'):
+            raise ValueError(f"Unknown retrieval mode '{mode}'. Valid modes are 'hybrid', 'vector' and 'lexical'.")
+        self.mode = mode
+        self.vectors_path = vectors_path
+        # Documents, vector index and lexical index are swapped together by update(), so queries read them as one tuple
+        self._index = self._build_index(docs, vectors, key)
+        # Embedding provider selected by RENTAL_EMBEDDINGS, see embeddings.py
+        self.provider = provider or create_provider()
+        self._update_lock = threading.Lock()
+
+    @staticmethod
+    def _store_key(store: VectorStore) -> str:
+        return f"{store.model}:{store.corpus_hash}"
 
-        if response.status_code != 200:
-            raise Exception(f"Request failed with status code {response.status_code}: {response.text}")
+    def _build_index(self, docs: list, vectors, key: Optional[str] = None) -> tuple:
+        # No vectors: lexical only. float32 arrays (including memory-mapped ones) are used as is, without a copy;
+        # an IVF index, if one is needed, is saved next to the vectors under the key of their store
+        vector_index = None
+        if vectors is not None:
+            vector_index = create_vector_index(np.asarray(vectors, dtype=np.float32),
+                                               cache_path=os.path.splitext(self.vectors_path)[0] + '.ivf.npz', key=key)
+        return vector_index, docs, BM25Index([doc["page_content"] for doc in docs])
 
-        result = response.json()
+    @property
+    def docs(self) -> list:
+        return self._index[1]
 
-        if isinstance(result, list) and isinstance(result[0], float):
-            return result
-        else:
-            raise KeyError(f"Unexpected response structure: {result}")
+    def get_embedding(self, text):
+        return self.provider.embed_query(text)
 
     @classmethod
-    def from_docs(cls, docs, vectors_path='vectors.json'):
-        # Check if vectors file exists
-        if os.path.exists(vectors_path):
-            print("Loading vectors from file...")
-            try:
-                with open(vectors_path, 'r') as f:
-                    vectors = json.load(f)
-                if not vectors:
-                    raise ValueError("The vectors file is empty.")
-            except (json.JSONDecodeError, ValueError) as e:
-                print(f"Error loading vectors from file: {e}")
-                print("Generating vectors...")
-                vectors = cls.generate_vectors(docs, vectors_path)
-        else:
-            print("Vectors file does not exist. Generating vectors...")
-            vectors = cls.generate_vectors(docs, vectors_path)
-
-        return cls(docs, vectors)
+    def from_docs(cls, docs, vectors_path=vectors_path, provider: Optional[EmbeddingProvider] = None):
+        provider = provider or create_provider()
+        # Use the vector store if it was built from these very documents by this provider
+        store = VectorStore.open(vectors_path)
+        if store is not None and store.matches(docs, provider.name):
+            return cls(docs, store.vectors, provider, vectors_path, key=cls._store_key(store))
+        print("Vectors missing or out of date. Embedding new and changed documents...")
+        try:
+            store, counts = reindex(vectors_path, docs, provider.embed_documents, provider.name)
+        except EmbeddingError as e:
+            print(f"Could not embed the documents, using lexical retrieval only: {e}")
+            return cls(docs, None, provider, vectors_path)
+        print(f"Policy vectors: {counts['reused']} reused, {counts['embedded']} embedded, {counts['removed']} removed")
+        return cls(docs, store.vectors, provider, vectors_path, key=cls._store_key(store))
 
-    @staticmethod
-    def generate_vectors(docs, vectors_path):
-        vectors = []
-        instance = VectorStoreRetriever(docs, vectors)
-        for doc in docs:
-            time.sleep(1)  # Adjust sleep time as necessary
-            embedding = instance.get_embedding(doc["page_content"][:2000])
-            vectors.append(embedding)
+    def update(self, docs: list) -> dict:
+        """
+        Re-index the retriever for a new version of its documents, in place.
+
+        Only added or changed documents are embedded; queries keep using the previous version
+        until the new one is complete, and keep using it if the new one cannot be embedded.
 
-        # Save the vectors to a file
-        with open(vectors_path, 'w') as f:
-            json.dump(vectors, f)
+        Returns:
+            dict: Counts of `reused`, `embedded` and `removed` documents.
 
-        return vectors
+        Raises:
+            EmbeddingError: If the new documents could not be embedded.
+        """
+        with self._update_lock:
+            # On EmbeddingError the previous index stays in place and the caller retries later
+            store, counts = reindex(self.vectors_path, docs, self.provider.embed_documents, self.provider.name)
+            self._index = self._build_index(docs, store.vectors, self._store_key(store))
+        return counts
+
+    def _query_embedding(self, vector_index: Optional[ExactIndex], query: str) -> Optional[np.ndarray]:
+        if vector_index is None or self.mode == 'lexical':
+            return None
+        try:
+            return self.get_embedding(query)
+        except EmbeddingError as e:
+            if self.mode == 'vector':
+                raise
+            print(f"Embedding service unavailable, using lexical retrieval only: {e}")
+            return None
 
     def query(self, query: str, k: int = 5) -> list[dict]:
-        time.sleep(1)  # Adjust sleep time as necessary
-        query_embedding = self.get_embedding(query[:2000])
+        vector_index, docs, lexical = self._index
+        k = min(k, len(docs))
+        if not k:
+            return []
+        query_embedding = self._query_embedding(vector_index, query)
+        if query_embedding is None and self.mode == 'vector':
+            raise EmbeddingError("No document vectors are available.")
+
+        if self.mode == 'vector':
+            top_k_idx_sorted, scores = vector_index.search(query_embedding, k)
+            return [
+                {**docs[idx], "similarity": score} for idx, score in zip(top_k_idx_sorted, scores)
+            ]
 
-        scores = np.dot(self._arr, query_embedding)
-        top_k_idx = np.argpartition(scores, -k)[-k:]
-        top_k_idx_sorted = top_k_idx[np.argsort(-scores[top_k_idx])]
+        # Fuse the top candidates of each ranking
+        candidates = min(max(4 * k, 20), len(docs))
+        bm25 = lexical.search(query, candidates)
+        rankings = [[idx for idx, _ in bm25]]
+        if query_embedding is not None:
+            rankings.append(vector_index.search(query_embedding, candidates)[0].tolist())
+        fused = reciprocal_rank_fusion(rankings)[:k]
+        similarities = [None] * len(fused)
+        if query_embedding is not None:
+            similarities = vector_index.score([idx for idx, _ in fused], query_embedding).tolist()
+        bm25_scores = dict(bm25)
         return [
-            {**self._docs[idx], "similarity": scores[idx]} for idx in top_k_idx_sorted
+            {**docs[idx], "score": score, "similarity": similarity, "bm25": bm25_scores.get(idx, 0.0)}
+            for (idx, score), similarity in zip(fused, similarities)
         ]
 
 
-# Example usage:
-policy_rules_text = load_policy_rules(policy_rules_path)
-docs = [{"page_content": txt} for txt in re.split(r"(?=\n##)", policy_rules_text)]
-retriever = VectorStoreRetriever.from_docs(docs)
+class PolicyWatcher:
+    """
+    Applies edits of the policy rules file to a running retriever.
+
+    `check()` compares the file's modification time and size with the last version indexed
+    and, if they changed, re-splits the file and calls `retriever.update()`, so only edited
+    sections are embedded again. `start()` runs the checks every `interval` seconds in a
+    daemon thread, so re-indexing never happens on a user's turn; policy lookups only call
+    `ensure_running()`, which restarts the thread in processes forked after it was started.
+    """
+
+    def __init__(self, retriever: VectorStoreRetriever, rules_path: str = policy_rules_path,
+                 interval: float = policy_watch_interval):
+        self.retriever = retriever
+        self.rules_path = rules_path
+        self.interval = interval
+        # Unknown until the first check, which re-splits the file but only embeds what the store lacks
+        self._signature = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.rules_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def check(self, wait: bool = True) -> Optional[dict]:
+        """
+        Re-index the retriever if the rules file changed since the last check.
+
+        Args:
+            wait (bool): Wait for a check in progress in another thread, instead of returning at once.
+
+        Returns:
+            dict: The counts returned by `VectorStoreRetriever.update`, or None if nothing was done.
+        """
+        if not self._lock.acquire(blocking=wait):
+            return None
+        try:
+            signature = self._stat()
+            if signature is None or signature == self._signature:
+                return None
+            counts = self.retriever.update(split_policy_rules(load_policy_rules(self.rules_path)))
+            self._signature = signature
+            if counts['embedded'] or counts['removed']:
+                print(f"Policy rules changed: {counts['reused']} sections reused, {counts['embedded']} embedded, "
+                      f"{counts['removed']} removed")
+            return counts
+        finally:
+            self._lock.release()
+
+    def ensure_running(self):
+        """Restart the watcher thread if it died, e.g. in a process forked after it was started."""
+        if self._thread is not None and not self._thread.is_alive():
+            # Threads do not survive fork()
+            self.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.check(wait=False)
+            except Exception as e:
+                # Keep serving the previous version, e.g. while the embedding service is down
+                print(f"Could not re-index the policy rules: {e}")
+
+    def start(self) -> 'PolicyWatcher':
+        """Start checking for edits every `interval` seconds in a daemon thread."""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='policy-watcher', daemon=True)
+            self._thread.start()
+        return self
+
+
+def create_retriever(rules_path: str = policy_rules_path) -> VectorStoreRetriever:
+    """
+    Build the retriever over the policy rules, one document per rule and FAQ entry.
+
+    Args:
+        rules_path (str): The policy rules in Markdown.
+
+    Returns:
+        VectorStoreRetriever: The retriever.
+    """
+    return VectorStoreRetriever.from_docs(split_policy_rules(load_policy_rules(rules_path)))
@@ -1,4 +1,7 @@
 from conf import *
+import json
+import re
+import threading
 from datetime import date, datetime, timedelta
 from langchain_core.messages.human import HumanMessage
 from langchain_core.messages.ai import AIMessage
@@ -18,29 +21,20 @@ from langgraph.prebuilt import tools_condition
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import Runnable, RunnableConfig
 from fuzzywuzzy import process, fuzz
+from store import ConflictError, booking_store, fleet_store, user_store, get_store, booking_view, retry_on_conflict
+from dates import format_dates, format_record
+from suggestions import suggest_alternatives
 
 def load_data(file_path):
-    if os.path.exists(file_path):
-        return pd.read_csv(file_path)
-    else:
-        return pd.DataFrame()
+    return get_store(file_path).data()
 
 
 def save_data(df, file_path):
-    df.to_csv(file_path, index=False)
-
-
-cars_df = load_data(CARS_FILE_PATH)
-bookings_df = load_data(BOOKINGS_FILE_PATH)
-users_df = load_data(USERS_FILE_PATH)
+    get_store(file_path).save(df)
 
-min_price = cars_df['price'].min()
-max_price = cars_df['price'].max()
-unique_car_types = cars_df['car_type'].unique()
 
-with open('Rental-Car-Business-Demo/data/user_id.conf', 'r') as file:
-    user_id = int(file.read().strip())
-user_info = users_df[users_df['user_id'] == int(user_id)]
+# Written by the login page for the user the agent acts on behalf of
+USER_ID_CONF_PATH = 'Rental-Car-Business-Demo/data/user_id.conf'
 
 
 
@@ -49,6 +43,9 @@ user_info = users_df[users_df['user_id'] == int(user_id)]
 def lookup_policy(query: str) -> str:
     """Consult the company policies to check whether certain options are permitted.
     Use this before making any flight changes performing other 'write' events."""
+    retriever = runtime.retriever
+    if runtime.policy_watcher is not None:
+        runtime.policy_watcher.ensure_running()
     docs = retriever.query(query, k=2)
     return "\n\n".join([doc["page_content"] for doc in docs])
 
@@ -252,11 +249,9 @@ def is_car_available(car_id: int, start_date: str, end_date: str) -> str:
     Returns:
         str: A message indicating whether the car is available or not, or an error message if dates are invalid.
     """
-    bookings_df = load_data(BOOKINGS_FILE_PATH)
-
     def parse_date(date_str: str) -> Optional[datetime]:
         try:
-            return parse(date_str, fuzzy=True)
+            return parse(date_str, fuzzy=True, dayfirst=True)
         except (ParserError, ValueError, OverflowError):
             return None
 
@@ -270,30 +265,18 @@ def is_car_available(car_id: int, start_date: str, end_date: str) -> str:
         #return "Error: Start date must be before end date."
 
     try:
-        car_bookings = bookings_df[(bookings_df['car_id'] == car_id) & (bookings_df['booking_status'] == 2)]
-        for booking in car_bookings.itertuples():
-            booking_start_date = parse_date(booking.start_date)
-            booking_end_date = parse_date(booking.end_date)
-            if booking_start_date and booking_end_date:
-                if booking_start_date <= parsed_end_date and booking_end_date >= parsed_start_date:
-                    return f"The car with ID {car_id} is not available for the specified dates."
+        if not booking_store.is_car_available(car_id, parsed_start_date, parsed_end_date):
+            suggestions = suggest_alternatives(car_id, parsed_start_date, parsed_end_date)
+            return (f"The car with ID {car_id} is not available for the specified dates. "
+                    f"Free periods for this car: {suggestions['free_windows']}. "
+                    f"Available cars of the same type and price band: {suggestions['alternative_cars']}.")
         return f"The car with ID {car_id} is available for the specified dates."
     except Exception as e:
         return f"An error occurred while checking availability: {str(e)}"
 
 
 def is_car_available2(car_id: int, start_date: date, end_date: date) -> bool:
-    bookings_df = load_data(BOOKINGS_FILE_PATH)
-
-    car_bookings = bookings_df[(bookings_df['car_id'] == car_id) & (bookings_df['booking_status'] == 2)]
-    for booking in car_bookings.itertuples():
-        booking_start_date = parse(booking.start_date)
-        booking_end_date = parse(booking.end_date)
-
-
-        if start_date <= booking_end_date and end_date >= booking_start_date:
-            return False
-    return True
+    return booking_store.is_car_available(car_id, start_date, end_date)
 
 
 
@@ -316,16 +299,16 @@ def car_search(car_name: str = None,
     Returns:
         dict: A dictionary containing available cars that match the search criteria.
     """
-    cars_df = load_data(CARS_FILE_PATH)
+    cars_df = fleet_store.data()
     cars = cars_df
 
 
 
     # Parse dates if provided
     if start_date:
-        start_date = parse(start_date)
+        start_date = parse(start_date, dayfirst=True)
     if end_date:
-        end_date = parse(end_date)
+        end_date = parse(end_date, dayfirst=True)
 
     # Fuzzy matching for car name
     if car_name:
@@ -349,18 +332,27 @@ def car_search(car_name: str = None,
         best_match = process.extractOne(car_type, car_types, scorer=fuzz.token_set_ratio)
         if best_match and best_match[1] >= 70:  # 70% similarity threshold
             car_type = best_match[0]
-        cars = cars[cars['car_type'] == car_type]
-
+        if car_name:
+            cars = cars[cars['car_type'] == car_type]
 
 
 
-    # Apply price range filter
-    if price_range:
-        cars = cars[(cars['price'] >= price_range[0]) & (cars['price'] <= price_range[1])]
 
-    # Apply date availability filter
+    available = None
     if start_date and end_date:
-        cars = cars[cars['car_id'].apply(lambda car_id: is_car_available2(car_id, start_date, end_date))]
+        available = lambda car_ids: booking_store.available_mask(car_ids, start_date, end_date)
+
+    if car_name:
+        # Apply price range filter
+        if price_range:
+            cars = cars[(cars['price'] >= price_range[0]) & (cars['price'] <= price_range[1])]
+
+        # Apply date availability filter
+        if available is not None:
+            cars = cars[available(cars['car_id'])]
+    else:
+        # Type, price range and availability through the sorted fleet index, cheapest first
+        cars = fleet_store.search(car_type or None, price_range, where=available)
 
     # Convert DataFrame to list of dictionaries
     result = {'available_cars': cars.to_dict(orient='records')}
@@ -387,48 +379,80 @@ def car_booking(car_id: int, start_date: str, end_date: str) -> dict:
         dict : Return a dictionarie with booking info if succeful or error.
     """
 
-
-    bookings_df = load_data(BOOKINGS_FILE_PATH)
-    cars_df = load_data(CARS_FILE_PATH)
-
     # Parse the start and end dates with flexible format handling
-    start_date = parse(start_date)
-    end_date = parse(end_date)
+    start_date = parse(start_date, dayfirst=True)
+    end_date = parse(end_date, dayfirst=True)
 
     if is_car_available2(car_id, start_date, end_date):
 
         days = (end_date - start_date).days
-        car_price = cars_df.loc[cars_df['car_id'] == car_id, 'price'].values[0]
+        car_price = fleet_store.price(car_id)
         total_price = abs(days * car_price)
 
-        new_booking_id = bookings_df['booking_id'].max() + 1 if not bookings_df.empty else 1
         new_booking = {
-            'booking_id': new_booking_id,
             'car_id': car_id,
-            'user_id': user_id,
-            'start_date': start_date.strftime('%d/%m/%Y'),
-            'end_date': end_date.strftime('%d/%m/%Y'),
+            'user_id': runtime.user_id,
+            'start_date': start_date,
+            'end_date': end_date,
             'total_price': total_price,
             'booking_status': 1  # Status 1 = Pending
         }
 
-        new_booking_df = pd.DataFrame([new_booking])
-        bookings_df = pd.concat([bookings_df, new_booking_df], ignore_index=True)
-        save_data(bookings_df, BOOKINGS_FILE_PATH)
+        def check(booking):
+            # Checked again under the bookings write lock, another session may have booked the car meanwhile
+            if not booking_store.is_car_available(car_id, start_date, end_date):
+                raise ValueError("Car is not available for the specified dates.")
 
-        return new_booking
+        try:
+            return format_record(booking_store.insert(new_booking, check=check))
+        except ValueError as e:
+            return {"error": str(e), **_alternatives(car_id, start_date, end_date)}
     else:
-        return {"error": "Car is not available for the specified dates."}
+        return {"error": "Car is not available for the specified dates.", **_alternatives(car_id, start_date, end_date)}
+
+
+def _alternatives(car_id: int, start_date: datetime, end_date: datetime) -> dict:
+    # Offered with a failed booking so that the agent does not need more searches to propose something
+    try:
+        suggestions = suggest_alternatives(car_id, start_date, end_date)
+    except ValueError:
+        return {}
+    return {"free_windows": suggestions['free_windows'], "alternative_cars": suggestions['alternative_cars']}
+
+
+@tool
+def find_alternatives(car_id: int, start_date: str, end_date: str) -> dict:
+    """
+    Find alternatives when a car is not available: the nearest free periods of the same length for this car,
+    and available cars of the same type and similar price for the requested dates. Use this single call
+    instead of several car_search / is_car_available calls.
+
+    Args:
+        car_id (int): ID of the requested car (car_id).
+        start_date (str): Requested start date of the rental period in dd/mm/YYYY date format.
+        end_date (str): Requested end date of the rental period in dd/mm/YYYY date format.
+
+    Returns:
+        dict: "available" for the requested dates, "free_windows" (nearest first) and "alternative_cars" (closest price first), or an error.
+    """
+    try:
+        start_date = parse(start_date, dayfirst=True)
+        end_date = parse(end_date, dayfirst=True)
+    except (ParserError, ValueError, OverflowError):
+        return {"error": "Invalid date format. Please use dd/mm/YYYY."}
+    try:
+        return suggest_alternatives(car_id, start_date, end_date)
+    except ValueError as e:
+        return {"error": str(e)}
 
 
 
 def is_booking_available(booking_id: int) -> bool:
-    bookings_df = load_data(BOOKINGS_FILE_PATH)
+    booking = booking_store.get(booking_id)
 
     # Check if the booking_id exists and is not canceled (status != 0)
-    if booking_id in bookings_df['booking_id'].values:
-        booking_status = bookings_df.loc[bookings_df['booking_id'] == booking_id, 'booking_status'].values[0]
-        return booking_status != 0
+    if booking is not None:
+        return booking['booking_status'] != 0
 
     return False
 
@@ -449,21 +473,20 @@ def booking_canceling(booking_id: int) -> dict:
         if not is_booking_available(booking_id):
             return {"error": f"Booking ID {booking_id} is not available or has already been canceled."}
 
-        bookings_df = load_data(BOOKINGS_FILE_PATH)
+        def check(booking):
+            if booking['booking_status'] == 0:
+                raise ValueError(f"Booking ID {booking_id} is not available or has already been canceled.")
 
         # Cancel the booking by setting its status to 0 (Cancelled)
-        bookings_df.loc[bookings_df['booking_id'] == booking_id, 'booking_status'] = 0
-        save_data(bookings_df, BOOKINGS_FILE_PATH)
-
-        # Retrieve the updated booking and return it
-        updated_booking = bookings_df[bookings_df['booking_id'] == booking_id].to_dict(orient='records')[0]
-        return {"success": True, "data": updated_booking}
+        updated_booking = booking_store.update(booking_id, check=check, booking_status=0)
+        return {"success": True, "data": format_record(updated_booking)}
 
     except Exception as e:
         # Handle any unexpected errors
         return {"error": str(e)}
 
 @tool
+@retry_on_conflict
 def booking_update(booking_id: int, new_start_date: str, new_end_date: str) -> dict:
     """
     Update an existing booking with new start and end dates.
@@ -481,13 +504,9 @@ def booking_update(booking_id: int, new_start_date: str, new_end_date: str) -> d
         if not is_booking_available(booking_id):
             return {"error": f"Booking ID {booking_id} is not available or has already been canceled."}
 
-        # Load bookings and cars data
-        bookings_df = load_data(BOOKINGS_FILE_PATH)
-        cars_df = load_data(CARS_FILE_PATH)
-
         # Retrieve the booking and car information
-        booking = bookings_df[bookings_df['booking_id'] == booking_id].iloc[0]
-        if booking.booking_status == 2:
+        booking = booking_store.get(booking_id)
+        if booking['booking_status'] == 2:
             return {"error": f"Booking ID {booking_id} is already confirmed, you need to update it manually by cancel it and rebook it with the updates"}
 
         car_id = booking['car_id']
@@ -508,10 +527,10 @@ def booking_update(booking_id: int, new_start_date: str, new_end_date: str) -> d
             return {"error": "The car is not available for the new dates specified."}
 
         # Get the price for the car
-        car_info = cars_df[cars_df['car_id'] == car_id]
-        if car_info.empty:
+        car_info = fleet_store.get(car_id)
+        if car_info is None:
             return {"error": "Car ID not found."}
-        price_per_day = car_info.iloc[0]['price']
+        price_per_day = car_info['price']
 
         # Calculate the new total price
         duration = (new_end_date - new_start_date).days
@@ -519,18 +538,24 @@ def booking_update(booking_id: int, new_start_date: str, new_end_date: str) -> d
             return {"error": "End date must be after start date."}
         total_price = duration * int(price_per_day)
 
-        # Update the booking with the new dates and total price
-        bookings_df.loc[bookings_df['booking_id'] == booking_id, 'start_date'] = new_start_date.strftime('%d/%m/%Y')
-        bookings_df.loc[bookings_df['booking_id'] == booking_id, 'end_date'] = new_end_date.strftime('%d/%m/%Y')
-        bookings_df.loc[bookings_df['booking_id'] == booking_id, 'total_price'] = total_price
-
-        # Save the updated bookings data
-        save_data(bookings_df, BOOKINGS_FILE_PATH)
-
-        # Retrieve the updated booking and return it
-        updated_booking = bookings_df[bookings_df['booking_id'] == booking_id].to_dict(orient='records')[0]
-        return {"success": True, "data": updated_booking}
-
+        def check(current):
+            if not booking_store.is_car_available(car_id, new_start_date, new_end_date, exclude_booking_id=booking_id):
+                raise ValueError("The car is not available for the new dates specified.")
+
+        # Update the booking with the new dates and total price and save it, unless another session
+        # changed it since it was read above (then the whole tool call is retried)
+        updated_booking = booking_store.update(
+            booking_id,
+            expected={key: booking[key] for key in ('car_id', 'start_date', 'end_date', 'booking_status')},
+            check=check,
+            start_date=new_start_date,
+            end_date=new_end_date,
+            total_price=total_price,
+        )
+        return {"success": True, "data": format_record(updated_booking)}
+
+    except ConflictError:
+        raise
     except Exception as e:
         # Handle any unexpected errors
         return {"error": str(e)}
@@ -546,13 +571,8 @@ def show_my_pending_booked_cars() -> dict:
     Returns:
         dict: dictionary of cars that are currently booked by the user with pending status.
     """
-    global  user_id
-    bookings_df = load_data(BOOKINGS_FILE_PATH)
-    cars_df = load_data(CARS_FILE_PATH)
-
-    user_bookings = bookings_df[(bookings_df['user_id'] == user_id) & (bookings_df['booking_status'] == 1)]
-    booked_cars = pd.merge(user_bookings, cars_df, on='car_id')
-    return booked_cars.to_dict(orient='records')
+    booked_cars = booking_view.rows(booking_store.user_booking_ids(runtime.user_id, [1]))
+    return format_dates(booked_cars).to_dict(orient='records')
 
 
 @tool
@@ -576,31 +596,31 @@ def show_my_confirmed_booked_cars() -> dict:
         dict: dictionary of cars that are currently booked by the user with confirmed status.
     """
 
-    bookings_df = load_data(BOOKINGS_FILE_PATH)
-    cars_df = load_data(CARS_FILE_PATH)
-
-    user_bookings = bookings_df[(bookings_df['user_id'] == user_id) & (bookings_df['booking_status'] == 2)]
-    booked_cars = pd.merge(user_bookings, cars_df, on='car_id')
-    return booked_cars.to_dict(orient='records')
+    booked_cars = booking_view.rows(booking_store.user_booking_ids(runtime.user_id, [2]))
+    return format_dates(booked_cars).to_dict(orient='records')
 
 
 @tool
-def show_my_booking_history() -> dict:
+def show_my_booking_history(cursor: Optional[str] = None, page_size: int = 5) -> dict:
     """
-    Retrieve the complete bookings history for the user.
+    Retrieve the bookings history for the user (past and present bookings, excluding pending bookings), most recent first, one page at a time.
+
+    Args:
+        cursor (str, optional): The next_cursor returned by the previous call, to get the following page. Leave empty for the first page.
+        page_size (int): Number of bookings per page, between 1 and 20 (default 5).
 
     Returns:
-        dict: dictionnairy of the last 5  bookings (past and present) by the user, excluding pending bookings. for more than 5 user need to check the bookings history manually
+        dict: dictionary with the page's "bookings" and a "next_cursor". When next_cursor is not null, older bookings are available by calling this tool again with it.
     """
-    bookings_df = load_data(BOOKINGS_FILE_PATH)
-    cars_df = load_data(CARS_FILE_PATH)
-
-    user_history = bookings_df[(bookings_df['user_id'] == user_id) & (bookings_df['booking_status'] != 1)]
-    # Merge with car data to get detailed information
-    booking_history = pd.merge(user_history, cars_df, on='car_id')
-    last_five_bookings = booking_history.tail(5)
+    page_size = min(max(int(page_size), 1), 20)
+    try:
+        booking_ids, next_cursor = booking_store.user_booking_ids_page(runtime.user_id, [0, 2], page_size, cursor or None)
+    except ValueError as e:
+        return {"error": str(e)}
+    # Bookings with their car data to get detailed information
+    booking_history = booking_view.rows(booking_ids)
 
-    return last_five_bookings.to_dict(orient='records')
+    return {"bookings": format_dates(booking_history).to_dict(orient='records'), "next_cursor": next_cursor}
 
 
 @tool
@@ -611,8 +631,8 @@ def show_personal_info() -> dict:
     Returns:
         dict: dictionary containing personal information of the  user.
     """
-    global user_id
-    return users_df[users_df['user_id'] == user_id].to_dict(orient='records')
+    users_df = user_store.data()
+    return users_df[users_df['user_id'] == runtime.user_id].to_dict(orient='records')
 
 
 @tool
@@ -626,6 +646,7 @@ def show_car_info(car_id: int) -> dict:
     Returns:
         dict: dictionary containing details of the specified car.
     """
+    cars_df = fleet_store.data()
     return cars_df[cars_df['car_id'] == car_id].to_dict(orient='records')
 
 
@@ -637,8 +658,7 @@ def show_cars() -> dict:
     Returns:
         dict: dictionary containing details of all cars.
     """
-    global cars_df
-    return cars_df.to_dict(orient='records')
+    return fleet_store.data().to_dict(orient='records')
 
 
 def handle_tool_error(state) -> dict:
@@ -903,11 +923,12 @@ primary_assistant_prompt = ChatPromptTemplate.from_messages(
             "- Book a car for a specified period. The booking will initially be pending confirmation. ** you cant confirm penfing bookings , the user need to it manually**\n"
             "- Retrieve company policies related to bookings, cancellations, and other services.\n"
             "- Check if a specific car is available for the desired dates.\n"
+            "- When a car is not available, propose its nearest free dates and similar available cars (returned with the failed booking or availability check, or by find_alternatives) instead of searching again.\n"
             "- Cancel an existing booking by updating its status to 'Cancelled'.\n"
             "- Update an existing booking with new start and end dates, ensuring the car is available for the new dates.\n"
             "- Display a list of cars that the user has booked but not yet confirmed.\n"
             "- Display a list of cars that the user has confirmed bookings for.\n"
-            "- Show the user’s up to 5 last bookings history (for more than 5 , the user need to check the history manually).\n"
+            "- Show the user’s bookings history page by page, most recent first (pass the returned next_cursor to get older bookings when the user asks for more).\n"
             "- Display the user’s personal information stored in the system.\n"
             "- Provide detailed information about a specific car.\n"
             "- List all available cars in the inventory.\n"
@@ -924,10 +945,11 @@ primary_assistant_prompt = ChatPromptTemplate.from_messages(
         ),
         ("placeholder", "{messages}"),
     ]
-).partial(user_info=user_info, time=datetime.now().strftime('%d/%m/%Y'))
+)
 
 part_1_tools = [
     car_booking,
+    find_alternatives,
     lookup_policy,
     is_car_available,
     booking_canceling,
@@ -943,26 +965,128 @@ part_1_tools = [
     show_cars,
     car_search,
 ]
-part_1_assistant_runnable = primary_assistant_prompt | llm.bind_tools(part_1_tools)
-
-builder = StateGraph(State)
-
-# Define nodes: these do the work
-builder.add_node("assistant", Assistant(part_1_assistant_runnable))
-builder.add_node("tools", create_tool_node_with_fallback(part_1_tools))
-# Define edges: these determine how the control flow moves
-builder.add_edge(START, "assistant")
-builder.add_conditional_edges(
-    "assistant",
-    tools_condition,
-)
-builder.add_edge("tools", "assistant")
 
-# The checkpointer lets the graph persist its state
-# this is a complete memory for the entire graph.
-memory = MemorySaver()
-
-part_1_graph = builder.compile(checkpointer=memory)
 
+class AgentRuntime:
+    """
+    The agent and everything it needs, built on first use and cached for the process.
 
+    Nothing is loaded when `core` is imported: the current user, the policy retriever (which
+    reads `vectors.npy` or calls the embedding API), the LLM and the compiled graph are each
+    created the first time they are needed, once, even when several sessions ask at the same
+    time. A missing data file therefore only fails the request that needs it.
+    """
 
+    def __init__(self, user_id_path: str = USER_ID_CONF_PATH):
+        self.user_id_path = user_id_path
+        self._lock = threading.RLock()
+        self._components = {}
+
+    def _component(self, name: str, build):
+        component = self._components.get(name)
+        if component is None:
+            with self._lock:
+                component = self._components.get(name)
+                if component is None:
+                    component = self._components[name] = build()
+        return component
+
+    def _read_user_id(self) -> int:
+        with open(self.user_id_path, 'r') as file:
+            return int(file.read().strip())
+
+    def _read_user_info(self) -> pd.DataFrame:
+        users_df = user_store.data()
+        return users_df[users_df['user_id'] == self.user_id]
+
+    def _build_graph(self):
+        part_1_assistant_runnable = self.prompt | self.llm.bind_tools(part_1_tools)
+
+        builder = StateGraph(State)
+
+        # Define nodes: these do the work
+        builder.add_node("assistant", Assistant(part_1_assistant_runnable))
+        builder.add_node("tools", create_tool_node_with_fallback(part_1_tools))
+        # Define edges: these determine how the control flow moves
+        builder.add_edge(START, "assistant")
+        builder.add_conditional_edges(
+            "assistant",
+            tools_condition,
+        )
+        builder.add_edge("tools", "assistant")
+
+        # The checkpointer lets the graph persist its state
+        # this is a complete memory for the entire graph.
+        memory = MemorySaver()
+
+        return builder.compile(checkpointer=memory)
+
+    @property
+    def user_id(self) -> int:
+        """ID of the user the agent acts on behalf of, read from `user_id.conf`."""
+        return self._component('user_id', self._read_user_id)
+
+    @property
+    def user_info(self) -> pd.DataFrame:
+        """Record of the current user, as shown to the LLM."""
+        return self._component('user_info', self._read_user_info)
+
+    def _build_retriever(self) -> VectorStoreRetriever:
+        retriever = create_retriever()
+        if policy_watch_interval > 0:
+            self._components['policy_watcher'] = PolicyWatcher(retriever).start()
+        return retriever
+
+    @property
+    def retriever(self) -> VectorStoreRetriever:
+        """Retriever over the company policy sections."""
+        return self._component('retriever', self._build_retriever)
+
+    @property
+    def policy_watcher(self) -> Optional[PolicyWatcher]:
+        """Watcher applying edits of the policy rules to the retriever, None unless `RENTAL_POLICY_WATCH` is set."""
+        self.retriever
+        return self._components.get('policy_watcher')
+
+    @property
+    def llm(self):
+        """The chat model, see `conf.create_llm`."""
+        return self._component('llm', create_llm)
+
+    @property
+    def prompt(self) -> ChatPromptTemplate:
+        """The system prompt, filled with the current user. The current date is filled in on every call."""
+        return self._component('prompt', lambda: primary_assistant_prompt.partial(
+            user_info=self.user_info, time=lambda: datetime.now().strftime('%d/%m/%Y')))
+
+    @property
+    def graph(self):
+        """The compiled agent graph, with its conversation memory."""
+        return self._component('graph', self._build_graph)
+
+    def warm_up(self) -> 'AgentRuntime':
+        """
+        Build every component now instead of on the first request.
+
+        Meant for servers that load the application once and then fork workers: call it in the
+        parent so that workers start with the tables parsed, the vectors loaded and the graph compiled.
+
+        Returns:
+            AgentRuntime: This runtime.
+        """
+        for table in (fleet_store, booking_store, user_store):
+            table.data()
+        booking_store.availability()
+        fleet_store.fleet_index()
+        self.retriever
+        self.graph
+        return self
+
+
+# Shared by every session of the process
+runtime = AgentRuntime()
+
+
+def warm_up() -> AgentRuntime:
+    """Build the shared agent runtime ahead of the first request, e.g. before forking server workers."""
+    return runtime.warm_up()
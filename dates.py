@@ -0,0 +1,91 @@
+from datetime import date, datetime
+import pandas as pd
+
+DATE_FORMAT = '%d/%m/%Y'
+
+# Booking columns stored as typed dates in memory and as dd/mm/YYYY strings on disk
+BOOKING_DATE_COLUMNS = ('start_date', 'end_date')
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def to_timestamp(value) -> pd.Timestamp:
+    """
+    Convert a date to a midnight `pd.Timestamp`.
+
+    Args:
+        value: A `date`, a `datetime`, a `pd.Timestamp` or a string in dd/mm/YYYY format.
+
+    Returns:
+        pd.Timestamp: The day, without time of day.
+    """
+    if isinstance(value, str):
+        return pd.Timestamp(datetime.strptime(value, DATE_FORMAT))
+    return pd.Timestamp(value).normalize()
+
+
+def to_ordinal(value) -> int:
+    """
+    Convert a date to its proleptic Gregorian ordinal.
+
+    Args:
+        value: A `date`, a `datetime`, an ordinal or a string in dd/mm/YYYY format.
+
+    Returns:
+        int: The ordinal of the day.
+    """
+    if isinstance(value, str):
+        value = datetime.strptime(value, DATE_FORMAT)
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, date):
+        return value.toordinal()
+    return int(value)
+
+
+def parse_date_column(column: pd.Series) -> pd.Series:
+    """
+    Parse a dd/mm/YYYY string column into a datetime64 column. Already typed columns are returned as is.
+
+    Unparseable values become NaT.
+    """
+    if pd.api.types.is_datetime64_any_dtype(column):
+        return column
+    return pd.to_datetime(column, format=DATE_FORMAT, errors='coerce')
+
+
+def ordinal_column(column: pd.Series) -> pd.Series:
+    """
+    Convert a date column (typed or dd/mm/YYYY strings) into day ordinals in one vectorized pass.
+
+    Missing or unparseable values become -1.
+    """
+    days = (parse_date_column(column) - pd.Timestamp('1970-01-01')).dt.days
+    return (days + _EPOCH_ORDINAL).fillna(-1).astype('int64')
+
+
+def format_date(value) -> str:
+    """Format a date as dd/mm/YYYY. Missing values become an empty string."""
+    if value is None or pd.isna(value):
+        return ''
+    if isinstance(value, str):
+        return value
+    return value.strftime(DATE_FORMAT)
+
+
+def format_dates(df: pd.DataFrame, columns=BOOKING_DATE_COLUMNS) -> pd.DataFrame:
+    """
+    Return a copy of a table with its date columns formatted as dd/mm/YYYY strings.
+
+    Meant for the output edge: tool results and Streamlit rendering.
+    """
+    df = df.copy()
+    for column in columns:
+        if column in df.columns and pd.api.types.is_datetime64_any_dtype(df[column]):
+            df[column] = df[column].dt.strftime(DATE_FORMAT).fillna('')
+    return df
+
+
+def format_record(record: dict, columns=BOOKING_DATE_COLUMNS) -> dict:
+    """Return a copy of a row dictionary with its date values formatted as dd/mm/YYYY strings."""
+    return {key: format_date(value) if key in columns else value for key, value in record.items()}
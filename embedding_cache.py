@@ -0,0 +1,181 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+import numpy as np
+from embeddings import EmbeddingProvider
+
+# Number of query embeddings kept in memory per process (0 disables the cache)
+CACHE_SIZE = int(os.getenv('RENTAL_QUERY_CACHE_SIZE', '1024'))
+# Seconds a cached query embedding stays valid
+CACHE_TTL = float(os.getenv('RENTAL_QUERY_CACHE_TTL', '86400'))
+# Optional SQLite file shared by every process as a second cache tier
+CACHE_PATH = os.getenv('RENTAL_QUERY_CACHE_PATH') or None
+# Maximum number of embeddings kept in the shared file
+DISK_CACHE_SIZE = int(os.getenv('RENTAL_QUERY_CACHE_DISK_SIZE', '100000'))
+
+_SPACES = re.compile(r'\s+')
+
+
+def normalize_query(text: str) -> str:
+    """Normalize a query for caching: lower case, single spaces, no surrounding punctuation."""
+    return _SPACES.sub(' ', text.lower()).strip(' .,;:!?"\'')
+
+
+class EmbeddingCache:
+    """
+    Bounded cache of query embeddings keyed by (model, normalized query).
+
+    The memory tier is an LRU of at most `max_entries` vectors, each valid for `ttl` seconds.
+    With a `path`, misses fall through to a SQLite file shared by every process on the host
+    (an embedding computed by one Streamlit worker is reused by the others), which keeps at
+    most `disk_entries` rows, dropping the oldest. Counters are available from `stats()`.
+    """
+
+    def __init__(self, max_entries: int = CACHE_SIZE, ttl: float = CACHE_TTL, path: Optional[str] = CACHE_PATH,
+                 disk_entries: int = DISK_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self.disk_entries = disk_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._connection = None
+        self._pid = None
+        self._disk_writes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _db(self) -> sqlite3.Connection:
+        # Called with the lock held. A connection must not be used across fork()
+        if self._connection is None or self._pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA busy_timeout=5000')
+            connection.execute('CREATE TABLE IF NOT EXISTS query_embeddings (model TEXT NOT NULL, query TEXT NOT NULL, '
+                               'vector BLOB NOT NULL, created REAL NOT NULL, PRIMARY KEY (model, query))')
+            connection.execute('CREATE INDEX IF NOT EXISTS idx_query_embeddings_created ON query_embeddings (created)')
+            self._connection, self._pid = connection, os.getpid()
+        return self._connection
+
+    def _remember(self, key: tuple, vector: np.ndarray, expires: float):
+        self._entries[key] = (vector, expires)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, model: str, query: str) -> Optional[np.ndarray]:
+        """
+        Look up the embedding of a normalized query.
+
+        Returns:
+            np.ndarray: The read-only vector, or None on a miss or if the entry expired.
+        """
+        key = (model, query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                del self._entries[key]
+            if self.path is not None:
+                try:
+                    row = self._db().execute('SELECT vector, created FROM query_embeddings WHERE model = ? AND query = ?',
+                                             key).fetchone()
+                except sqlite3.Error:
+                    row = None
+                if row is not None and row[1] + self.ttl > time.time():
+                    vector = np.frombuffer(row[0], dtype=np.float32)
+                    self._remember(key, vector, time.monotonic() + row[1] + self.ttl - time.time())
+                    self.disk_hits += 1
+                    return vector
+            self.misses += 1
+            return None
+
+    def put(self, model: str, query: str, vector) -> np.ndarray:
+        """
+        Cache the embedding of a normalized query.
+
+        Returns:
+            np.ndarray: The cached vector, float32 and read-only.
+        """
+        key = (model, query)
+        vector = np.array(vector, dtype=np.float32)
+        vector.setflags(write=False)
+        with self._lock:
+            self._remember(key, vector, time.monotonic() + self.ttl)
+            if self.path is not None:
+                try:
+                    db = self._db()
+                    now = time.time()
+                    db.execute('INSERT OR REPLACE INTO query_embeddings (model, query, vector, created) VALUES (?, ?, ?, ?)',
+                               (model, query, vector.tobytes(), now))
+                    self._disk_writes += 1
+                    # Trim the shared file now and then rather than on every write
+                    if self._disk_writes % 100 == 1:
+                        db.execute('DELETE FROM query_embeddings WHERE created <= ?', (now - self.ttl,))
+                        db.execute('DELETE FROM query_embeddings WHERE rowid IN (SELECT rowid FROM query_embeddings '
+                                   'ORDER BY created DESC LIMIT -1 OFFSET ?)', (self.disk_entries,))
+                except sqlite3.Error:
+                    # The shared tier is an optimization: a busy or unwritable file must not fail the query
+                    pass
+        return vector
+
+    def clear(self):
+        """Empty the memory tier and reset the counters. The shared file is left as is."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.disk_hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        """Return the counters: `hits` (memory), `disk_hits`, `misses`, `evictions`, `size` and `hit_rate`."""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+                'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
+
+class CachedEmbeddingProvider(EmbeddingProvider):
+    """
+    Wraps a provider so that query embeddings are served from an `EmbeddingCache`.
+
+    Queries are normalized with `normalize_query` before being embedded, so that every
+    spelling of a cached question maps to the same vector. Document embeddings are not cached;
+    the vector store keeps those.
+    """
+
+    def __init__(self, provider: EmbeddingProvider, cache: Optional[EmbeddingCache] = None):
+        super().__init__(provider.batch_size)
+        self.provider = provider
+        self.cache = cache or EmbeddingCache()
+        self.name = provider.name
+
+    def _embed_batch(self, texts: list) -> np.ndarray:
+        return self.provider._embed_batch(texts)
+
+    def embed_documents(self, texts: list) -> np.ndarray:
+        return self.provider.embed_documents(texts)
+
+    def embed_query(self, text: str) -> np.ndarray:
+        query = normalize_query(text)
+        vector = self.cache.get(self.name, query)
+        if vector is None:
+            vector = self.cache.put(self.name, query, self.provider.embed_query(query))
+        return vector
@@ -0,0 +1,232 @@
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from typing import Optional
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+from rate_limit import TokenBucket
+
+# Embedding provider: 'http' (Hugging Face inference API, default) or 'local' (hashed n-grams, offline)
+PROVIDER = os.getenv('RENTAL_EMBEDDINGS', 'http')
+# Number of texts sent per embedding request
+BATCH_SIZE = int(os.getenv('RENTAL_EMBEDDING_BATCH_SIZE', '16'))
+
+HUGGINGFACE_API_URL = 'https://api-inference.huggingface.co/models/jinaai/jina-embeddings-v2-base-en'
+HUGGINGFACE_API_KEY = os.getenv('HUGGINGFACE_API_KEY', '$huggingface_api_here$')  # Replace with your API key
+# Quota of the embedding service: sustained requests per second and burst size, shared by the whole process
+REQUEST_RATE = float(os.getenv('RENTAL_EMBEDDING_RATE', '1'))
+REQUEST_BURST = float(os.getenv('RENTAL_EMBEDDING_BURST', '5'))
+# Attempts after a failed request (connection error, 429 or 5xx), with jittered exponential backoff
+MAX_RETRIES = int(os.getenv('RENTAL_EMBEDDING_RETRIES', '3'))
+# Keep-alive connections per embedding service
+POOL_SIZE = int(os.getenv('RENTAL_EMBEDDING_POOL_SIZE', '8'))
+
+_WORD = re.compile(r'\w+')
+
+
+class EmbeddingError(Exception):
+    """Raised when a provider cannot embed texts, e.g. the embedding service failed or is unreachable."""
+
+
+class EmbeddingProvider:
+    """
+    Turns texts into vectors, a batch at a time.
+
+    Subclasses implement `_embed_batch`; callers use `embed_documents` for a corpus (split into
+    batches of `batch_size` texts) and `embed_query` for a single text. `name` identifies the
+    model: vectors from providers with different names cannot be compared.
+    """
+
+    name = None
+
+    def __init__(self, batch_size: int = BATCH_SIZE):
+        self.batch_size = max(int(batch_size), 1)
+
+    def _embed_batch(self, texts: list) -> np.ndarray:
+        raise NotImplementedError
+
+    def embed_documents(self, texts: list) -> np.ndarray:
+        """
+        Embed a list of texts.
+
+        Returns:
+            np.ndarray: One float32 row per text.
+
+        Raises:
+            EmbeddingError: If a batch cannot be embedded.
+        """
+        batches = [self._embed_batch(texts[i:i + self.batch_size]) for i in range(0, len(texts), self.batch_size)]
+        if not batches:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.concatenate(batches).astype(np.float32, copy=False)
+
+    def embed_query(self, text: str) -> np.ndarray:
+        """Embed one text, returning a float32 vector."""
+        return self.embed_documents([text])[0]
+
+
+# Rate limiters and HTTP sessions, one per service URL, shared by every provider of the process
+_limiters = {}
+_sessions = {}
+_clients_lock = threading.Lock()
+
+
+def get_limiter(api_url: str, rate: float = REQUEST_RATE, burst: float = REQUEST_BURST) -> TokenBucket:
+    """Return the shared rate limiter of a service, creating it with the given quota on first use."""
+    with _clients_lock:
+        if api_url not in _limiters:
+            _limiters[api_url] = TokenBucket(rate, burst)
+        return _limiters[api_url]
+
+
+def get_session(api_url: str) -> requests.Session:
+    """Return the shared keep-alive session of a service (a new one after fork, as sockets must not be shared)."""
+    with _clients_lock:
+        session, pid = _sessions.get(api_url, (None, None))
+        if session is None or pid != os.getpid():
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _sessions[api_url] = (session, os.getpid())
+        return session
+
+
+class HttpEmbeddingProvider(EmbeddingProvider):
+    """
+    Embeddings from a Hugging Face inference endpoint (feature extraction), one request per batch.
+
+    Texts are truncated to `max_chars`. Requests go through the service's shared token bucket
+    (`RENTAL_EMBEDDING_RATE` per second, bursts of `RENTAL_EMBEDDING_BURST`), so they only wait
+    when the quota is actually used up, and reuse the connections of a shared keep-alive session.
+    Connection errors, 429 and 5xx responses are retried up to `retries` times after a jittered
+    exponential backoff, or after the delay the service asks for in `Retry-After`.
+    """
+
+    def __init__(self, api_url: str = HUGGINGFACE_API_URL, api_key: str = HUGGINGFACE_API_KEY,
+                 batch_size: int = BATCH_SIZE, max_chars: int = 2000, retries: int = MAX_RETRIES,
+                 backoff: float = 0.5, timeout: float = 30.0, limiter: Optional[TokenBucket] = None):
+        super().__init__(batch_size)
+        self.api_url = api_url
+        self.headers = {'Authorization': f'Bearer {api_key}'}
+        self.max_chars = max_chars
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.limiter = limiter or get_limiter(api_url)
+        self.name = api_url.rstrip('/').split('/models/')[-1]
+
+    def _retry_delay(self, attempt: int, response: Optional[requests.Response]) -> float:
+        delay = random.uniform(0, self.backoff * 2 ** attempt)
+        if response is not None:
+            try:
+                delay = max(delay, float(response.headers.get('Retry-After', 0)))
+            except ValueError:
+                pass
+        return delay
+
+    def _post(self, payload: dict) -> requests.Response:
+        for attempt in range(self.retries + 1):
+            self.limiter.acquire()
+            response = None
+            try:
+                response = get_session(self.api_url).post(self.api_url, headers=self.headers, json=payload,
+                                                          timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.retries:
+                    raise EmbeddingError(f"Embedding request failed: {e}") from e
+            except requests.RequestException as e:
+                raise EmbeddingError(f"Embedding request failed: {e}") from e
+            else:
+                if response.status_code != 429 and response.status_code < 500 or attempt == self.retries:
+                    return response
+            delay = self._retry_delay(attempt, response)
+            if response is not None and response.status_code == 429:
+                # Throttled: hold back every caller of this service, not just this one
+                self.limiter.pause(delay)
+            time.sleep(delay)
+
+    def _embed_batch(self, texts: list) -> np.ndarray:
+        response = self._post({"inputs": [text[:self.max_chars] for text in texts]})
+
+        if response.status_code != 200:
+            raise EmbeddingError(f"Request failed with status code {response.status_code}: {response.text}")
+
+        result = response.json()
+
+        if isinstance(result, list) and len(result) == len(texts) and \
+                all(isinstance(vector, list) and vector and isinstance(vector[0], float) for vector in result):
+            return np.array(result, dtype=np.float32)
+        raise EmbeddingError(f"Unexpected response structure: {result}")
+
+
+class HashingEmbeddingProvider(EmbeddingProvider):
+    """
+    Local embeddings that need no model and no network: hashed word and character n-gram counts.
+
+    Every word and every character n-gram of the padded words is hashed (CRC32) into one of
+    `dimension` buckets with a hash-derived sign, counts are damped with 1 + log(count), and
+    vectors are L2-normalized, so the dot product is a cosine similarity of lexical overlap.
+    Deterministic across processes and machines. Meant for development, tests and offline
+    deployments; it matches wording, not meaning.
+    """
+
+    def __init__(self, dimension: int = 768, ngram_range: tuple = (3, 5), batch_size: int = 256):
+        super().__init__(batch_size)
+        self.dimension = dimension
+        self.ngram_range = ngram_range
+        self.name = f"hashing-{dimension}-{ngram_range[0]}-{ngram_range[1]}"
+
+    def _features(self, text: str) -> list:
+        words = _WORD.findall(text.lower())
+        features = list(words)
+        low, high = self.ngram_range
+        for word in words:
+            padded = f"<{word}>"
+            for n in range(low, high + 1):
+                features.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+        return features
+
+    def _embed_batch(self, texts: list) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            hashes = np.fromiter((zlib.crc32(feature.encode('utf-8')) for feature in self._features(text)),
+                                 dtype=np.uint32)
+            if not len(hashes):
+                continue
+            buckets, counts = np.unique(hashes, return_counts=True)
+            # The top bit picks the sign, so that colliding features tend to cancel out
+            signs = np.where(buckets >> 31, -1.0, 1.0)
+            np.add.at(vectors[row], buckets % self.dimension, signs * (1.0 + np.log(counts)))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1.0, norms)
+
+
+def create_provider(name: str = PROVIDER, batch_size: Optional[int] = None, cache: bool = True) -> EmbeddingProvider:
+    """
+    Create the embedding provider selected by `RENTAL_EMBEDDINGS`.
+
+    Args:
+        name (str): 'http' or 'local'.
+        batch_size (int, optional): Texts per batch, by default `RENTAL_EMBEDDING_BATCH_SIZE` for
+            'http' and 256 for 'local'.
+        cache (bool): Serve repeated queries from a query-embedding cache (see embedding_cache.py),
+            unless `RENTAL_QUERY_CACHE_SIZE` is 0.
+
+    Raises:
+        ValueError: If the provider name is unknown.
+    """
+    if name == 'http':
+        provider = HttpEmbeddingProvider(batch_size=batch_size or BATCH_SIZE)
+    elif name == 'local':
+        provider = HashingEmbeddingProvider(batch_size=batch_size or 256)
+    else:
+        raise ValueError(f"Unknown embedding provider '{name}'. Valid providers are 'http' and 'local'.")
+    from embedding_cache import CACHE_SIZE, CachedEmbeddingProvider
+    if cache and CACHE_SIZE > 0:
+        return CachedEmbeddingProvider(provider)
+    return provider
@@ -0,0 +1,142 @@
+from itertools import islice
+from typing import Callable, Iterator, Optional
+import numpy as np
+import pandas as pd
+
+# Group of the whole fleet, used when no car type is given
+ALL_TYPES = None
+
+
+class PriceGroup:
+    """Car IDs of one group sorted by (price, car_id), with the prices as a parallel array."""
+
+    __slots__ = ('prices', 'car_ids')
+
+    def __init__(self, prices: np.ndarray, car_ids: np.ndarray):
+        self.prices = prices
+        self.car_ids = car_ids
+
+    def _position(self, price, car_id) -> int:
+        # First position whose (price, car_id) is not smaller than the given key
+        low = int(np.searchsorted(self.prices, price, side='left'))
+        high = int(np.searchsorted(self.prices, price, side='right'))
+        return low + int(np.searchsorted(self.car_ids[low:high], car_id, side='left'))
+
+    def add(self, car_id, price):
+        position = self._position(price, car_id)
+        self.prices = np.insert(self.prices, position, price)
+        self.car_ids = np.insert(self.car_ids, position, car_id)
+
+    def remove(self, car_id, price):
+        position = self._position(price, car_id)
+        if position < len(self.car_ids) and self.car_ids[position] == car_id:
+            self.prices = np.delete(self.prices, position)
+            self.car_ids = np.delete(self.car_ids, position)
+
+    def range(self, min_price=None, max_price=None) -> np.ndarray:
+        """Return the car IDs priced within [min_price, max_price], cheapest first, as a view."""
+        low = 0 if min_price is None else int(np.searchsorted(self.prices, min_price, side='left'))
+        high = len(self.prices) if max_price is None else int(np.searchsorted(self.prices, max_price, side='right'))
+        return self.car_ids[low:high]
+
+
+class FleetIndex:
+    """
+    Cars grouped by `car_type` and sorted by price within each group.
+
+    A price-range query is two binary searches in its group, and results come back as a lazy
+    iterator in price order (ties broken by car ID). The index is kept up to date by feeding
+    every changed car row to `sync()`.
+    """
+
+    def __init__(self):
+        self._groups = {}
+        self._cars = {}
+
+    @classmethod
+    def from_cars(cls, cars_df: pd.DataFrame) -> 'FleetIndex':
+        """
+        Build the index from a cars table with `car_id`, `car_type` and `price` columns.
+        """
+        index = cls()
+        if cars_df.empty:
+            index._groups[ALL_TYPES] = PriceGroup(np.array([], dtype='float64'), np.array([], dtype='int64'))
+            return index
+        rows = pd.DataFrame({
+            'car_id': cars_df['car_id'].to_numpy(),
+            'car_type': cars_df['car_type'].astype(object).to_numpy(),
+            'price': cars_df['price'].to_numpy(dtype='float64'),
+        }).sort_values(['price', 'car_id'], kind='stable')
+        index._groups[ALL_TYPES] = PriceGroup(rows['price'].to_numpy(), rows['car_id'].to_numpy())
+        for car_type, group in rows.groupby('car_type', sort=False):
+            index._groups[car_type] = PriceGroup(group['price'].to_numpy(), group['car_id'].to_numpy())
+        index._cars = dict(zip(rows['car_id'].tolist(), zip(rows['car_type'].tolist(), rows['price'].tolist())))
+        return index
+
+    def remove(self, car_id: int):
+        """Forget a car. Unknown IDs are ignored."""
+        entry = self._cars.pop(car_id, None)
+        if entry is not None:
+            car_type, price = entry
+            self._groups[car_type].remove(car_id, price)
+            self._groups[ALL_TYPES].remove(car_id, price)
+
+    def sync(self, car: dict):
+        """Apply the current type and price of a car row to the index."""
+        entry = (car['car_type'], float(car['price']))
+        if self._cars.get(car['car_id']) == entry:
+            return
+        self.remove(car['car_id'])
+        for group in (entry[0], ALL_TYPES):
+            if group not in self._groups:
+                self._groups[group] = PriceGroup(np.array([], dtype='float64'), np.array([], dtype='int64'))
+            self._groups[group].add(car['car_id'], entry[1])
+        self._cars[car['car_id']] = entry
+
+    def search(self, car_type: Optional[str] = None, min_price=None, max_price=None) -> Iterator:
+        """
+        Iterate over the cars of a type within a price range, cheapest first.
+
+        Args:
+            car_type (str, optional): Exact car type, None for the whole fleet.
+            min_price (float, optional): Lowest price included.
+            max_price (float, optional): Highest price included.
+
+        Returns:
+            Iterator: Car IDs. The matching range is found up front; IDs are produced on demand.
+        """
+        group = self._groups.get(car_type)
+        if group is None:
+            return iter(())
+        return (int(car_id) for car_id in group.range(min_price, max_price))
+
+
+def take(car_ids: Iterator, rows: Callable[[list], pd.DataFrame], where: Optional[Callable] = None,
+         offset: int = 0, limit: Optional[int] = None, chunk_size: int = 256) -> pd.DataFrame:
+    """
+    Consume an ordered iterator of car IDs lazily and return the rows of the selected ones.
+
+    Args:
+        car_ids (Iterator): Car IDs in result order, e.g. from `FleetIndex.search`.
+        rows (callable): Returns the rows of a list of car IDs, in the same order.
+        where (callable, optional): Returns a boolean mask for a list of car IDs, e.g. availability for
+            a period. Only matching cars are counted and returned.
+        offset (int): Number of matching cars to skip.
+        limit (int, optional): Maximum number of cars to return (top-k), None for all.
+        chunk_size (int): Number of car IDs checked per `where` call.
+
+    Returns:
+        pd.DataFrame: The selected rows in iterator order.
+    """
+    selected = []
+    # Without a limit every car is needed anyway, so filter them all in one call
+    chunk_size = chunk_size if limit is not None else None
+    while limit is None or len(selected) < offset + limit:
+        chunk = list(islice(car_ids, chunk_size))
+        if not chunk:
+            break
+        if where is not None:
+            chunk = [car_id for car_id, keep in zip(chunk, where(chunk)) if keep]
+        selected.extend(chunk)
+    end = None if limit is None else offset + limit
+    return rows(selected[offset:end]).reset_index(drop=True)
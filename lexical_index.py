@@ -0,0 +1,99 @@
+import math
+import re
+from collections import Counter
+from typing import List, Tuple
+import numpy as np
+
+_WORD = re.compile(r'\w+')
+
+STOP_WORDS = frozenset((
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'can', 'do', 'does', 'for', 'from', 'how', 'i', 'if', 'in',
+    'is', 'it', 'its', 'me', 'my', 'of', 'on', 'or', 'our', 'so', 'that', 'the', 'there', 'this', 'to', 'was',
+    'what', 'when', 'which', 'will', 'with', 'you', 'your',
+))
+
+
+def tokenize(text: str) -> list:
+    """Split a text into lower-case terms, without stop words and with plural endings removed."""
+    terms = []
+    for word in _WORD.findall(text.lower()):
+        if word in STOP_WORDS:
+            continue
+        if len(word) > 4 and word.endswith('ies'):
+            word = word[:-3] + 'y'
+        elif len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        terms.append(word)
+    return terms
+
+
+class BM25Index:
+    """
+    Inverted index of a list of texts, ranked with Okapi BM25.
+
+    Each term maps to the positions of the texts containing it and to its precomputed BM25
+    weight in each of them (the weight does not depend on the query), so scoring a query is
+    one vectorized scatter-add per query term over that term's postings.
+    """
+
+    def __init__(self, texts: list, k1: float = 1.5, b: float = 0.75):
+        self.size = len(texts)
+        counts = [Counter(tokenize(text)) for text in texts]
+        lengths = np.array([sum(count.values()) for count in counts], dtype=np.float64)
+        average = lengths.mean() if self.size and lengths.mean() > 0 else 1.0
+        norms = k1 * (1 - b + b * lengths / average)
+
+        postings = {}
+        for position, count in enumerate(counts):
+            for term, frequency in count.items():
+                postings.setdefault(term, []).append((position, frequency))
+        self._postings = {}
+        for term, entries in postings.items():
+            positions = np.array([position for position, _ in entries], dtype=np.int64)
+            frequencies = np.array([frequency for _, frequency in entries], dtype=np.float64)
+            idf = math.log(1 + (self.size - len(entries) + 0.5) / (len(entries) + 0.5))
+            weights = idf * frequencies * (k1 + 1) / (frequencies + norms[positions])
+            self._postings[term] = (positions, weights)
+
+    def scores(self, query: str) -> np.ndarray:
+        """Return the BM25 score of every text for a query (0 for texts sharing no term with it)."""
+        scores = np.zeros(self.size, dtype=np.float64)
+        for term in set(tokenize(query)):
+            posting = self._postings.get(term)
+            if posting is not None:
+                scores[posting[0]] += posting[1]
+        return scores
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[int, float]]:
+        """
+        Rank the texts for a query.
+
+        Returns:
+            list: Up to `k` (position, score) pairs of texts matching at least one query term, best first.
+        """
+        if k <= 0:
+            return []
+        scores = self.scores(query)
+        matching = np.flatnonzero(scores)
+        if len(matching) > k:
+            matching = matching[np.argpartition(-scores[matching], k - 1)[:k]]
+        matching = matching[np.argsort(-scores[matching], kind='stable')]
+        return [(int(position), float(scores[position])) for position in matching]
+
+
+def reciprocal_rank_fusion(rankings: list, k: int = 60) -> List[Tuple[int, float]]:
+    """
+    Merge several rankings of the same items with reciprocal rank fusion.
+
+    Args:
+        rankings (list): Lists of item positions, best first.
+        k (int): Damping constant; higher values give less weight to the top ranks.
+
+    Returns:
+        list: (position, fused score) pairs, best first. Ties keep the order of first appearance.
+    """
+    fused = {}
+    for ranking in rankings:
+        for rank, position in enumerate(ranking):
+            fused[position] = fused.get(position, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(fused.items(), key=lambda item: -item[1])
@@ -0,0 +1,537 @@
+import os
+import sqlite3
+import threading
+from datetime import date, datetime
+from typing import Callable, Optional, Tuple
+import numpy as np
+import pandas as pd
+from availability import AvailabilityIndex, STATUS_CONFIRMED
+from booking_index import decode_cursor, encode_cursor
+from fleet_index import FleetIndex, take
+from dates import BOOKING_DATE_COLUMNS, parse_date_column, to_ordinal, to_timestamp
+
+# Dates are stored as ISO text so that the indexes order them chronologically
+SQL_DATE_FORMAT = '%Y-%m-%d'
+
+
+def _sql_value(value):
+    """Convert a Python, NumPy or pandas value into something sqlite3 can bind."""
+    if value is None:
+        return None
+    if isinstance(value, (datetime, date)):
+        return None if pd.isna(value) else value.strftime(SQL_DATE_FORMAT)
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+
+def _sql_date(value) -> str:
+    return to_timestamp(value).strftime(SQL_DATE_FORMAT)
+
+
+class SqliteDatabase:
+    """
+    One SQLite database file shared by the table stores of a process.
+
+    A single connection is used from every thread, serialized by a lock. Other processes
+    see our changes as soon as a transaction commits, and the database runs in WAL mode so
+    their readers are not blocked by our writers.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.RLock()
+        self._connection = None
+        self._pid = None
+
+    def connection(self) -> sqlite3.Connection:
+        with self.lock:
+            # A connection must not be used across fork(), e.g. after a warm-up in a pre-fork server
+            if self._connection is None or self._pid != os.getpid():
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+                connection.execute('PRAGMA journal_mode=WAL')
+                connection.execute('PRAGMA busy_timeout=5000')
+                self._connection = connection
+                self._pid = os.getpid()
+            return self._connection
+
+    def data_version(self) -> int:
+        """Counter that changes whenever another connection commits to the database."""
+        with self.lock:
+            return self.connection().execute('PRAGMA data_version').fetchone()[0]
+
+
+class SqliteTableStore:
+    """
+    SQLite-backed replacement for `store.TableStore`, with the same reading and writing methods.
+
+    Point lookups use the primary key or the declared indexes, and every mutation runs in its
+    own transaction. `data()` still returns the whole table as a DataFrame with the same columns
+    and types as the CSV store, cached until the database changes. On first use an empty table
+    is filled from the CSV file it replaces.
+    """
+
+    table = None
+    columns = {}
+    indexes = {}
+    date_columns = ()
+
+    def __init__(self, database: SqliteDatabase, file_path: str, id_column: str, first_id: int = 1,
+                 table: Optional[str] = None, columns: Optional[dict] = None, indexes: Optional[dict] = None):
+        self.database = database
+        self.file_path = file_path
+        self.id_column = id_column
+        self.first_id = first_id
+        self.table = table or self.table
+        self.columns = columns or self.columns
+        self.indexes = indexes if indexes is not None else self.indexes
+        self._lock = database.lock
+        self._writes = 0
+        self._cache_key = None
+        self._df = None
+        self._ready = False
+        self._listeners = []
+        self.generation = 0
+
+    # Schema
+
+    def _ensure_schema(self):
+        if self._ready:
+            return
+        connection = self.database.connection()
+        column_defs = [
+            f"{name} INTEGER PRIMARY KEY AUTOINCREMENT" if name == self.id_column else f"{name} {sql_type}"
+            for name, sql_type in self.columns.items()
+        ]
+        connection.execute(f"CREATE TABLE IF NOT EXISTS {self.table} ({', '.join(column_defs)})")
+        for index_name, index_columns in self.indexes.items():
+            connection.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {self.table} ({', '.join(index_columns)})")
+        self._ready = True
+        empty = connection.execute(f"SELECT 1 FROM {self.table} LIMIT 1").fetchone() is None
+        if empty and os.path.exists(self.file_path):
+            self._replace(pd.read_csv(self.file_path), only_if_empty=True)
+
+    def _execute(self, sql: str, parameters=()) -> sqlite3.Cursor:
+        with self._lock:
+            self._ensure_schema()
+            return self.database.connection().execute(sql, parameters)
+
+    def _check_column(self, column: str):
+        if column not in self.columns:
+            raise ValueError(f"Unknown column '{column}' for table {self.table}.")
+
+    # Reading
+
+    def _typed(self, df: pd.DataFrame) -> pd.DataFrame:
+        for column in self.date_columns:
+            if column in df.columns:
+                df[column] = pd.to_datetime(df[column], format=SQL_DATE_FORMAT, errors='coerce')
+        return df
+
+    def _query(self, sql: str, parameters=()) -> pd.DataFrame:
+        with self._lock:
+            self._ensure_schema()
+            df = pd.read_sql_query(sql, self.database.connection(), params=list(parameters))
+        return self._typed(df)
+
+    def _version(self):
+        return self.database.data_version(), self._writes
+
+    def refresh(self) -> bool:
+        """
+        Reload the cached table if the database changed since it was last read.
+
+        Returns:
+            bool: True if the table was (re)loaded, False if the cached copy is still current.
+        """
+        with self._lock:
+            self._ensure_schema()
+            version = self._version()
+            if self._df is not None and version == self._cache_key:
+                return False
+            self._df = self._query(f"SELECT {', '.join(self.columns)} FROM {self.table} ORDER BY {self.id_column}")
+            self._cache_key = version
+            self.generation += 1
+            self._on_reload()
+            return True
+
+    def _on_reload(self):
+        """Hook called with the lock held every time the cached table is replaced."""
+
+    def add_listener(self, listener):
+        """
+        Register a function called after a row was inserted or updated through this store.
+
+        The cached table is reloaded after every write, so `generation` changes as well.
+        """
+        self._listeners.append(listener)
+
+    def data(self) -> pd.DataFrame:
+        """
+        Return the whole table. The returned DataFrame is shared and must not be modified in place.
+        """
+        with self._lock:
+            self.refresh()
+            return self._df
+
+    def get(self, row_id: int) -> Optional[dict]:
+        """
+        Retrieve one row by primary key.
+
+        Returns:
+            dict: The row's columns, or None if it does not exist.
+        """
+        rows = self._query(f"SELECT {', '.join(self.columns)} FROM {self.table} WHERE {self.id_column} = ?",
+                           (_sql_value(row_id),))
+        return rows.to_dict(orient='records')[0] if not rows.empty else None
+
+    def rows(self, row_ids) -> pd.DataFrame:
+        """
+        Retrieve rows by primary key, in the order of `row_ids` and indexed by their position in it.
+        Unknown IDs are left out.
+        """
+        row_ids = [_sql_value(row_id) for row_id in row_ids]
+        unique_ids = list(dict.fromkeys(row_ids))
+        select = f"SELECT {', '.join(self.columns)} FROM {self.table}"
+        # Batches stay well under SQLite's limit on bound parameters
+        batches = [unique_ids[i:i + 500] for i in range(0, len(unique_ids), 500)]
+        found = pd.concat([
+            self._query(f"{select} WHERE {self.id_column} IN ({', '.join('?' for _ in batch)})", batch)
+            for batch in batches
+        ], ignore_index=True) if batches else self._query(f"{select} LIMIT 0")
+        positions = dict(zip(found[self.id_column].tolist(), range(len(found))))
+        order = [(index, positions[row_id]) for index, row_id in enumerate(row_ids) if row_id in positions]
+        rows = found.iloc[[position for _, position in order]]
+        rows.index = [index for index, _ in order]
+        return rows
+
+    def find(self, column: str, value) -> pd.DataFrame:
+        """
+        Retrieve the rows whose `column` equals `value`.
+        """
+        self._check_column(column)
+        return self._query(f"SELECT {', '.join(self.columns)} FROM {self.table} WHERE {column} = ?",
+                           (_sql_value(value),))
+
+    # Writing
+
+    def _changed(self):
+        self._writes += 1
+
+    def _replace(self, df: pd.DataFrame, only_if_empty: bool = False):
+        columns = [column for column in self.columns if column in df.columns]
+        df = df.copy()
+        for column in self.date_columns:
+            if column in df.columns:
+                df[column] = parse_date_column(df[column])
+        rows = [[_sql_value(value) for value in row] for row in df[columns].itertuples(index=False, name=None)]
+        connection = self.database.connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            # The first-use import may race with another process that already imported and wrote
+            if only_if_empty and connection.execute(f"SELECT 1 FROM {self.table} LIMIT 1").fetchone() is not None:
+                connection.execute('ROLLBACK')
+                return
+            connection.execute(f"DELETE FROM {self.table}")
+            connection.executemany(
+                f"INSERT INTO {self.table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})", rows)
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+
+    def save(self, df: pd.DataFrame):
+        """
+        Replace the whole table in one transaction.
+        """
+        with self._lock:
+            self._ensure_schema()
+            self._replace(df)
+            self._changed()
+
+    def next_id(self) -> int:
+        """
+        Return the ID the next insert will get if none is given.
+        """
+        row = self._execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (self.table,)).fetchone()
+        return max(row[0] + 1, self.first_id) if row else self.first_id
+
+    def insert(self, row: dict, check: Optional[Callable[[dict], None]] = None) -> dict:
+        """
+        Insert one row in its own transaction.
+
+        Args:
+            row (dict): The new row. The `id_column` value is assigned if missing.
+                Dates may be `date`/`datetime` objects or dd/mm/YYYY strings.
+            check (callable, optional): Called with the new row inside the write transaction;
+                raise (e.g. `ValueError`) to abort the insert.
+
+        Returns:
+            dict: The inserted row.
+        """
+        with self._lock:
+            self._ensure_schema()
+            row = {column: value for column, value in row.items() if column in self.columns}
+            for column in self.date_columns:
+                if row.get(column) is not None:
+                    row[column] = to_timestamp(row[column])
+            connection = self.database.connection()
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                if check is not None:
+                    check(row)
+                if row.get(self.id_column) is None:
+                    row[self.id_column] = self.next_id()
+                columns = list(row)
+                connection.execute(
+                    f"INSERT INTO {self.table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+                    [_sql_value(row[column]) for column in columns])
+                connection.execute('COMMIT')
+            except Exception:
+                connection.execute('ROLLBACK')
+                raise
+            self._changed()
+            for listener in self._listeners:
+                listener(row)
+            return row
+
+    def _sql_changes(self, changes: dict) -> dict:
+        for column in changes:
+            self._check_column(column)
+        return {
+            column: _sql_date(value) if column in self.date_columns else _sql_value(value)
+            for column, value in changes.items()
+        }
+
+    def update(self, row_id: int, expected: Optional[dict] = None,
+               check: Optional[Callable[[dict], None]] = None, **changes) -> dict:
+        """
+        Change some columns of an existing row in its own transaction.
+
+        `expected` is checked in the UPDATE's WHERE clause (compare-and-swap) and `check` runs
+        inside the transaction, as for `store.TableStore.update`.
+
+        Returns:
+            dict: The updated row.
+
+        Raises:
+            ValueError: If the row does not exist.
+            ConflictError: If the row does not match `expected`.
+        """
+        from store import ConflictError
+
+        label = self.id_column.replace('_id', '').capitalize()
+        with self._lock:
+            self._ensure_schema()
+            values = self._sql_changes(changes)
+            conditions = self._sql_changes(expected or {})
+            assignments = ', '.join(f"{column} = ?" for column in values)
+            where = ''.join(f" AND {column} IS ?" for column in conditions)
+            connection = self.database.connection()
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                if check is not None:
+                    current = self.get(row_id)
+                    if current is None:
+                        raise ValueError(f"{label} ID {row_id} does not exist.")
+                    check(current)
+                cursor = connection.execute(
+                    f"UPDATE {self.table} SET {assignments} WHERE {self.id_column} = ?{where}",
+                    list(values.values()) + [_sql_value(row_id)] + list(conditions.values()))
+                if cursor.rowcount == 0:
+                    if self.get(row_id) is None:
+                        raise ValueError(f"{label} ID {row_id} does not exist.")
+                    raise ConflictError(f"{label} ID {row_id} was modified by another session.")
+                connection.execute('COMMIT')
+            except Exception:
+                connection.execute('ROLLBACK')
+                raise
+            self._changed()
+            row = self.get(row_id)
+            for listener in self._listeners:
+                listener(row)
+            return row
+
+
+class SqliteFleetStore(SqliteTableStore):
+    """SQLite table of cars."""
+
+    table = 'cars'
+    columns = {
+        'car_id': 'INTEGER', 'name': 'TEXT', 'car_type': 'TEXT', 'price': 'NUMERIC', 'year': 'INTEGER',
+        'fuel_type': 'TEXT', 'transmission': 'TEXT', 'mileage': 'INTEGER', 'image_path': 'TEXT',
+    }
+    indexes = {'idx_cars_type_price': ('car_type', 'price')}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._fleet_index = None
+
+    def _on_reload(self):
+        self._fleet_index = None
+
+    def price(self, car_id: int):
+        """
+        Retrieve the daily price of a car.
+
+        Raises:
+            ValueError: If the car does not exist.
+        """
+        row = self._execute("SELECT price FROM cars WHERE car_id = ?", (_sql_value(car_id),)).fetchone()
+        if row is None:
+            raise ValueError(f"Car ID {car_id} does not exist.")
+        return row[0]
+
+    def search(self, car_type: Optional[str] = None, price_range=None, where: Optional[Callable] = None,
+               offset: int = 0, limit: Optional[int] = None) -> pd.DataFrame:
+        """
+        Find cars of a type within a price range, cheapest first, through the sorted fleet index.
+
+        Args:
+            car_type (str, optional): Exact car type, None for the whole fleet.
+            price_range (tuple, optional): (min_price, max_price), both included.
+            where (callable, optional): Returns a boolean mask for a list of car IDs, e.g.
+                `lambda car_ids: booking_store.available_mask(car_ids, start, end)`.
+            offset (int): Number of matching cars to skip.
+            limit (int, optional): Maximum number of cars to return, None for all.
+
+        Returns:
+            pd.DataFrame: The matching cars, ordered by price then car ID.
+        """
+        min_price, max_price = price_range if price_range else (None, None)
+        # The iterator reads a snapshot of the index, so `where` runs without the fleet lock held
+        car_ids = self.fleet_index().search(car_type, min_price, max_price)
+        return take(car_ids, self.rows, where, offset, limit)
+
+    def fleet_index(self) -> FleetIndex:
+        """
+        Return the type/price index of the current table, rebuilt when the database changes.
+        """
+        with self._lock:
+            cars_df = self.data()
+            if self._fleet_index is None:
+                self._fleet_index = FleetIndex.from_cars(cars_df)
+            return self._fleet_index
+
+
+class SqliteBookingStore(SqliteTableStore):
+    """SQLite table of bookings, answering availability questions with indexed range queries."""
+
+    table = 'bookings'
+    columns = {
+        'booking_id': 'INTEGER', 'car_id': 'INTEGER', 'user_id': 'INTEGER', 'start_date': 'TEXT',
+        'end_date': 'TEXT', 'total_price': 'NUMERIC', 'booking_status': 'INTEGER',
+    }
+    indexes = {
+        'idx_bookings_car_status_start': ('car_id', 'booking_status', 'start_date'),
+        'idx_bookings_user_status': ('user_id', 'booking_status'),
+        'idx_bookings_user_start': ('user_id', 'start_date', 'booking_id'),
+    }
+    date_columns = BOOKING_DATE_COLUMNS
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._availability = None
+
+    def _on_reload(self):
+        self._availability = None
+
+    def availability(self) -> AvailabilityIndex:
+        """
+        Return an availability index of the current table, rebuilt when the database changes.
+        """
+        with self._lock:
+            self.refresh()
+            if self._availability is None:
+                self._availability = AvailabilityIndex.from_bookings(self._df)
+            return self._availability
+
+    def user_bookings(self, user_id: int, statuses) -> pd.DataFrame:
+        """
+        Retrieve the bookings of a user with one of the given statuses, using the (user_id, booking_status) index.
+        """
+        statuses = list(statuses)
+        return self._query(
+            f"SELECT {', '.join(self.columns)} FROM bookings WHERE user_id = ? "
+            f"AND booking_status IN ({', '.join('?' for _ in statuses)}) ORDER BY booking_id",
+            [_sql_value(user_id)] + [_sql_value(status) for status in statuses])
+
+    def user_bookings_page(self, user_id: int, statuses, page_size: int,
+                           cursor: Optional[str] = None) -> Tuple[pd.DataFrame, Optional[str]]:
+        """
+        Retrieve one page of a user's bookings with the given statuses, latest start date first.
+
+        Uses keyset pagination on the (user_id, start_date, booking_id) index, with the same cursors
+        as `store.BookingStore.user_bookings_page`.
+        """
+        statuses = list(statuses)
+        parameters = [_sql_value(user_id)] + [_sql_value(status) for status in statuses]
+        after = ''
+        if cursor is not None:
+            start, booking_id = decode_cursor(cursor)
+            start = date.fromordinal(start).strftime(SQL_DATE_FORMAT) if start > 0 else ''
+            after = "AND (COALESCE(start_date, '') < ? OR (COALESCE(start_date, '') = ? AND booking_id < ?))"
+            parameters += [start, start, booking_id]
+        rows = self._query(
+            f"SELECT {', '.join(self.columns)} FROM bookings WHERE user_id = ? "
+            f"AND booking_status IN ({', '.join('?' for _ in statuses)}) {after} "
+            f"ORDER BY COALESCE(start_date, '') DESC, booking_id DESC LIMIT ?",
+            parameters + [page_size + 1])
+        next_cursor = None
+        if len(rows) > page_size:
+            last = rows.iloc[page_size - 1]
+            start = -1 if pd.isna(last['start_date']) else to_ordinal(last['start_date'])
+            next_cursor = encode_cursor((start, int(last['booking_id'])))
+        return rows.iloc[:page_size].reset_index(drop=True), next_cursor
+
+    def user_booking_ids(self, user_id: int, statuses) -> list:
+        """
+        Return the IDs of a user's bookings with one of the given statuses, in ascending order.
+        """
+        return self.user_bookings(user_id, statuses)['booking_id'].tolist()
+
+    def user_booking_ids_page(self, user_id: int, statuses, page_size: int,
+                              cursor: Optional[str] = None) -> Tuple[list, Optional[str]]:
+        """
+        Same as `user_bookings_page`, returning the booking IDs of the page instead of the rows.
+        """
+        rows, next_cursor = self.user_bookings_page(user_id, statuses, page_size, cursor)
+        return rows['booking_id'].tolist(), next_cursor
+
+    def is_car_available(self, car_id: int, start_date, end_date, exclude_booking_id=None) -> bool:
+        """
+        Check if a car has no confirmed booking overlapping the given period.
+        """
+        row = self._execute(
+            "SELECT 1 FROM bookings WHERE car_id = ? AND booking_status = ? AND start_date <= ? AND end_date >= ? "
+            "AND booking_id IS NOT ? LIMIT 1",
+            (_sql_value(car_id), STATUS_CONFIRMED, _sql_date(end_date), _sql_date(start_date),
+             _sql_value(exclude_booking_id)),
+        ).fetchone()
+        return row is None
+
+    def available_mask(self, car_ids, start_date, end_date) -> np.ndarray:
+        """
+        Check the availability of many cars with a single query.
+
+        Returns:
+            np.ndarray: Boolean array aligned with `car_ids`, True where the car is available.
+        """
+        blocked = [row[0] for row in self._execute(
+            "SELECT DISTINCT car_id FROM bookings WHERE booking_status = ? AND start_date <= ? AND end_date >= ?",
+            (STATUS_CONFIRMED, _sql_date(end_date), _sql_date(start_date)),
+        )]
+        return ~np.isin(np.asarray(car_ids), blocked)
+
+
+class SqliteUserStore(SqliteTableStore):
+    """SQLite table of users, indexed by email for logins."""
+
+    table = 'users'
+    columns = {'user_id': 'INTEGER', 'name': 'TEXT', 'email': 'TEXT', 'phone': 'TEXT', 'address': 'TEXT'}
+    indexes = {'idx_users_email': ('email',)}
@@ -0,0 +1,781 @@
+import functools
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+from datetime import date, datetime
+from filelock import FileLock
+from typing import Callable, Optional, Tuple
+from availability import AvailabilityIndex
+from booking_index import UserBookingIndex
+from booking_view import BookingView
+from fleet_index import FleetIndex, take
+from columnar import columnar_path, load_table, write_table
+from dates import BOOKING_DATE_COLUMNS, DATE_FORMAT, format_date, parse_date_column, to_timestamp
+
+# File paths
+CARS_FILE_PATH = 'Rental-Car-Business-Demo/data/cars.csv'
+BOOKINGS_FILE_PATH = 'Rental-Car-Business-Demo/data/bookings.csv'
+USERS_FILE_PATH = 'Rental-Car-Business-Demo/data/users.csv'
+
+# Set RENTAL_FSYNC_WRITES=1 to flush every write to stable storage before returning
+FSYNC_WRITES = os.getenv('RENTAL_FSYNC_WRITES', '0') == '1'
+
+# Storage backend: 'csv' (default, the files above) or 'sqlite' (one database file, see sqlite_store.py)
+STORAGE_BACKEND = os.getenv('RENTAL_STORAGE_BACKEND', 'csv')
+SQLITE_FILE_PATH = os.getenv('RENTAL_SQLITE_PATH', 'Rental-Car-Business-Demo/data/rental.db')
+
+# Set RENTAL_MUTATION_LOG=1 to log booking updates to bookings.wal instead of rewriting bookings.csv
+MUTATION_LOG = os.getenv('RENTAL_MUTATION_LOG', '0') == '1'
+# Number of logged updates after which the log is folded into a fresh CSV snapshot
+COMPACT_AFTER = int(os.getenv('RENTAL_COMPACT_AFTER', '1000'))
+
+# Seconds to wait for another process's write lock, and attempts for conflicting read-modify-writes
+LOCK_TIMEOUT = float(os.getenv('RENTAL_LOCK_TIMEOUT', '10'))
+MAX_RETRIES = int(os.getenv('RENTAL_MAX_RETRIES', '5'))
+
+# Set RENTAL_COLUMNAR=1 to load tables from memory-mapped Arrow snapshots (see columnar.py) when present,
+# and to refresh the snapshot every time a CSV file is rewritten
+COLUMNAR_SNAPSHOTS = os.getenv('RENTAL_COLUMNAR', '0') == '1'
+
+
+class ConflictError(ValueError):
+    """Raised when a row changed between the moment it was read and the moment it was written."""
+
+
+def retry_on_conflict(func):
+    """
+    Re-run a read-modify-write function when it loses a compare-and-swap race.
+
+    The function is retried up to `MAX_RETRIES` times with a short jittered backoff, after
+    which the `ConflictError` is raised to the caller.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        for attempt in range(MAX_RETRIES):
+            try:
+                return func(*args, **kwargs)
+            except ConflictError:
+                if attempt == MAX_RETRIES - 1:
+                    raise
+                time.sleep(random.uniform(0, 0.005 * 2 ** attempt))
+    return wrapper
+
+
+def _fsync(file):
+    if FSYNC_WRITES:
+        file.flush()
+        os.fsync(file.fileno())
+
+
+def _json_value(value):
+    """Convert a cell value into something `json.dumps` accepts, dates as dd/mm/YYYY strings."""
+    if isinstance(value, (pd.Timestamp, datetime, date)):
+        return format_date(value)
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+
+class IdSequence:
+    """
+    Monotonic ID generator persisted in a small sidecar file next to its table.
+
+    Handing out an ID only reads and rewrites the sidecar, so it costs the same whatever
+    the size of the table. The sidecar is replaced atomically and never goes backwards.
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+
+    def _read(self) -> Optional[int]:
+        try:
+            with open(self.file_path, 'r') as file:
+                return int(file.read().strip())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def next(self, floor: int) -> int:
+        """
+        Issue a new ID.
+
+        Args:
+            floor (int): The highest ID already present in the table. The new ID is greater than it
+                even if the sidecar is missing or stale.
+
+        Returns:
+            int: The new ID, already persisted.
+        """
+        last = self._read()
+        value = max(floor, last if last is not None else floor) + 1
+        tmp_path = f"{self.file_path}.tmp"
+        with open(tmp_path, 'w') as file:
+            file.write(str(value))
+            _fsync(file)
+        os.replace(tmp_path, self.file_path)
+        return value
+
+
+class TableStore:
+    """
+    Keep one CSV table in memory and write every change back to disk.
+
+    The table is parsed once and served from memory afterwards. Each read compares the
+    file's mtime and size with the ones seen at the last read or write, so a change made
+    by another process (a Streamlit page, the agent, a manual edit) triggers a reload.
+
+    Columns listed in `date_columns` are parsed once at load time into datetime64 columns
+    and written back in dd/mm/YYYY format; formatting them for display is left to the caller.
+
+    New rows go through `insert()`, which appends a single line to the CSV file and takes
+    its ID from a persisted `IdSequence`, so inserting costs the same whatever the size of
+    the table.
+
+    By default `update()` rewrites the whole file. With `mutation_log=True` it appends a small
+    JSON record to a write-ahead log next to the CSV file (`bookings.wal`) instead. The CSV
+    file then acts as a snapshot: readers rebuild the table from it plus the log, and when only
+    the log grew they just replay its new tail. Once the log holds `compact_after` records a
+    background thread writes a fresh snapshot and truncates the log. Snapshots are written to a
+    temporary file and renamed, so a crash never leaves a truncated CSV file behind.
+
+    Writers from several threads or processes are kept consistent without holding a lock while
+    they think: reads take no lock, and each mutation takes a short per-table file lock
+    (`bookings.lock`), catches up with changes made by others, checks its preconditions against
+    that fresh state and writes. `update()` accepts the values the caller read (`expected=`) and
+    fails with `ConflictError` if another writer changed them in the meantime (compare-and-swap);
+    `retry_on_conflict` re-runs such read-modify-write functions a bounded number of times.
+    The file lock covers the whole table, not one car: all writes to a table are serialized,
+    however short. The CSV file is rewritten or appended as a whole, so there is no finer unit
+    to lock; what the design avoids is holding the lock across a user's turn, which the
+    `expected=` check makes unnecessary. The SQLite backend likewise serializes writers with
+    `BEGIN IMMEDIATE`.
+
+    The DataFrame returned by `data()` is shared: callers must not modify it in place,
+    they should go through `save()`, `insert()` or `update()`.
+    """
+
+    date_columns = ()
+
+    def __init__(self, file_path: str, id_column: Optional[str] = None, first_id: int = 1,
+                 mutation_log: bool = False, compact_after: int = COMPACT_AFTER):
+        self.file_path = file_path
+        self.id_column = id_column
+        self.first_id = first_id
+        self.wal_path = os.path.splitext(file_path)[0] + '.wal' if mutation_log else None
+        self.compact_after = compact_after
+        self._sequence = IdSequence(os.path.splitext(file_path)[0] + '.seq') if id_column else None
+        self._positions = None
+        self._lock = threading.RLock()
+        self._file_lock = FileLock(os.path.splitext(file_path)[0] + '.lock', timeout=LOCK_TIMEOUT)
+        self._df = None
+        self._signature = None
+        self._pending = []
+        self._max_id = None
+        self._wal_offset = 0
+        self._wal_records = 0
+        self._compacting = False
+        self._listeners = []
+        # Incremented every time the in-memory table is replaced rather than changed row by row
+        self.generation = 0
+
+    @staticmethod
+    def _stat(path: Optional[str]):
+        if path is None:
+            return None
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _file_signature(self):
+        return self._stat(self.file_path), self._stat(self.wal_path)
+
+    def _on_reload(self):
+        """Hook called with the lock held every time the in-memory table is replaced."""
+
+    def _on_row_changed(self, row: dict):
+        """Hook called with the lock held after a row was inserted or updated in place."""
+
+    def add_listener(self, listener: Callable[[dict], None]):
+        """
+        Register a function called with the lock held after a row was inserted or updated in place.
+
+        Listeners are not called when the whole table is replaced; `generation` changes instead.
+        """
+        self._listeners.append(listener)
+
+    def _reloaded(self):
+        self.generation += 1
+        self._on_reload()
+
+    def _row_changed(self, row: dict):
+        self._on_row_changed(row)
+        for listener in self._listeners:
+            listener(row)
+
+    def _typed(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Convert the date columns of a table to datetime64, leaving already typed columns untouched."""
+        columns = [column for column in self.date_columns if column in df.columns]
+        if not columns or all(pd.api.types.is_datetime64_any_dtype(df[column]) for column in columns):
+            return df
+        df = df.copy()
+        for column in columns:
+            df[column] = parse_date_column(df[column])
+        return df
+
+    def _typed_values(self, row: dict) -> dict:
+        return {column: to_timestamp(value) if column in self.date_columns else value
+                for column, value in row.items()}
+
+    def _label(self) -> str:
+        return self.id_column[:-len('_id')].capitalize() if self.id_column.endswith('_id') else self.id_column
+
+    # Reading
+
+    def refresh(self) -> bool:
+        """
+        Reload the table if the file (or its mutation log) changed on disk since it was last read or written.
+
+        Returns:
+            bool: True if the table was (re)loaded, False if the cached copy is still current.
+        """
+        with self._lock:
+            signature = self._file_signature()
+            if self._df is not None and signature == self._signature:
+                return False
+            if self._df is not None and self._can_replay_tail(signature):
+                self._materialize()
+                self._replay_log(notify=True)
+                self._signature = signature
+                return True
+            self._df = self._load() if signature[0] is not None else pd.DataFrame()
+            self._signature = signature
+            self._pending = []
+            self._positions = None
+            self._wal_offset = 0
+            self._wal_records = 0
+            self._replay_log(notify=False)
+            self._track_max_id()
+            self._reloaded()
+            return True
+
+    def _load(self) -> pd.DataFrame:
+        df = load_table(self.file_path) if COLUMNAR_SNAPSHOTS else None
+        if df is None:
+            df = pd.read_csv(self.file_path)
+        return self._typed(df)
+
+    def _can_replay_tail(self, signature) -> bool:
+        # Only the log grew: the snapshot is unchanged and the log was not truncated
+        return (self.wal_path is not None and signature[0] == self._signature[0]
+                and signature[1] is not None and signature[1][1] >= self._wal_offset)
+
+    def _replay_log(self, notify: bool):
+        try:
+            file = open(self.wal_path, 'rb') if self.wal_path else None
+        except FileNotFoundError:
+            file = None
+        if file is None:
+            return
+        # A freshly loaded table is private, a cached one is copied once before the first change
+        copy = notify
+        with file:
+            file.seek(self._wal_offset)
+            for line in file:
+                if not line.endswith(b'\n'):
+                    # Torn or still being written, it will be read on a later refresh
+                    break
+                self._wal_offset += len(line)
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                self._wal_records += 1
+                row = self._apply(record['id'], self._typed_values(record['changes']), copy=copy)
+                copy = copy and row is None
+                if row is not None and notify:
+                    self._row_changed(row)
+
+    def _track_max_id(self):
+        if self.id_column and self.id_column in self._df.columns and not self._df.empty:
+            self._max_id = int(self._df[self.id_column].max())
+        else:
+            self._max_id = None
+
+    def _materialize(self):
+        if self._pending:
+            categorical = [column for column, dtype in self._df.dtypes.items() if isinstance(dtype, pd.CategoricalDtype)]
+            self._df = pd.concat([self._df, pd.DataFrame(self._pending)], ignore_index=True)
+            for column in categorical:
+                self._df[column] = self._df[column].astype('category')
+            self._pending = []
+
+    def data(self) -> pd.DataFrame:
+        """
+        Return the current table, reloading it first if the file changed on disk.
+
+        Returns:
+            pd.DataFrame: The cached table. Returns an empty DataFrame if the file does not exist.
+        """
+        with self._lock:
+            self.refresh()
+            self._materialize()
+            return self._df
+
+    def get(self, row_id: int) -> Optional[dict]:
+        """
+        Retrieve one row by its `id_column` value.
+
+        Args:
+            row_id (int): ID of the row.
+
+        Returns:
+            dict: The row's columns, or None if the row does not exist.
+        """
+        rows = self.rows([row_id])
+        return rows.to_dict(orient='records')[0] if not rows.empty else None
+
+    def _row_positions(self) -> dict:
+        if self._positions is None:
+            ids = self._df[self.id_column].tolist() if self.id_column in self._df.columns else []
+            self._positions = dict(zip(ids, range(len(ids))))
+        return self._positions
+
+    def rows(self, row_ids) -> pd.DataFrame:
+        """
+        Retrieve rows by their `id_column` values through an ID -> row position lookup.
+
+        Args:
+            row_ids: Sequence of IDs, possibly repeated.
+
+        Returns:
+            pd.DataFrame: The rows in the order of `row_ids`, indexed by their position in `row_ids`.
+                Unknown IDs are left out.
+        """
+        with self._lock:
+            df = self.data()
+            positions = self._row_positions()
+            found = [(order, positions[row_id]) for order, row_id in enumerate(row_ids) if row_id in positions]
+            rows = df.iloc[[position for _, position in found]]
+            rows.index = [order for order, _ in found]
+            return rows
+
+    def find(self, column: str, value) -> pd.DataFrame:
+        """
+        Retrieve the rows whose `column` equals `value`.
+        """
+        df = self.data()
+        if column not in df.columns:
+            return df.iloc[0:0]
+        return df[df[column] == value]
+
+    # Writing
+
+    @contextmanager
+    def _exclusive(self):
+        """Hold the table's write lock, across threads and processes, with the cached copy up to date."""
+        with self._lock, self._file_lock:
+            self.refresh()
+            yield
+
+    def next_id(self) -> int:
+        """
+        Issue a new ID for the table's `id_column` from the persisted sequence.
+        """
+        with self._exclusive():
+            floor = self._max_id if self._max_id is not None else self.first_id - 1
+            return self._sequence.next(floor)
+
+    def insert(self, row: dict, check: Optional[Callable[[dict], None]] = None) -> dict:
+        """
+        Append one row to the table and to the end of the CSV file.
+
+        Args:
+            row (dict): The new row. The `id_column` value is assigned from the sequence if missing.
+                Dates may be `date`/`datetime` objects or dd/mm/YYYY strings.
+            check (callable, optional): Called with the new row while the write lock is held and the
+                table is up to date; raise (e.g. `ValueError`) to abort the insert.
+
+        Returns:
+            dict: The inserted row.
+        """
+        with self._exclusive():
+            row = self._typed_values(row)
+            if check is not None:
+                check(row)
+            if self.id_column:
+                if row.get(self.id_column) is None:
+                    row[self.id_column] = self.next_id()
+                row_id = int(row[self.id_column])
+                self._max_id = row_id if self._max_id is None else max(self._max_id, row_id)
+            self._append(row)
+            self._pending.append(row)
+            if self._positions is not None and self.id_column:
+                self._positions[row[self.id_column]] = len(self._df) + len(self._pending) - 1
+            self._row_changed(row)
+            return row
+
+    def _append(self, row: dict):
+        columns = list(self._df.columns) if len(self._df.columns) else list(row)
+        line = pd.DataFrame([row], columns=columns)
+        csv_stat = self._signature[0] if self._signature else None
+        write_header = csv_stat is None or csv_stat[1] == 0
+        with open(self.file_path, 'a+b') as file:
+            if not write_header:
+                file.seek(-1, os.SEEK_END)
+                if file.read(1) != b'\n':
+                    file.write(b'\n')
+            file.write(line.to_csv(index=False, header=write_header, date_format=DATE_FORMAT).encode())
+            _fsync(file)
+        if not len(self._df.columns):
+            self._df = pd.DataFrame(columns=columns)
+        self._signature = self._file_signature()
+
+    def update(self, row_id: int, expected: Optional[dict] = None,
+               check: Optional[Callable[[dict], None]] = None, **changes) -> dict:
+        """
+        Change some columns of an existing row and persist the change.
+
+        Args:
+            row_id (int): ID of the row to update.
+            expected (dict, optional): Column values the caller based its change on. If the row no
+                longer holds them, nothing is written and `ConflictError` is raised.
+            check (callable, optional): Called with the current row while the write lock is held and
+                the table is up to date; raise (e.g. `ValueError`) to abort the update.
+            **changes: Column values to set. Dates may be `date`/`datetime` objects or dd/mm/YYYY strings.
+
+        Returns:
+            dict: The updated row.
+
+        Raises:
+            ValueError: If the row does not exist.
+            ConflictError: If the row does not match `expected`.
+        """
+        with self._exclusive():
+            df = self.data()
+            mask = df[self.id_column] == row_id if not df.empty else None
+            if mask is None or not mask.any():
+                raise ValueError(f"{self._label()} ID {row_id} does not exist.")
+            current = df[mask].to_dict(orient='records')[0]
+            for column, value in self._typed_values(expected or {}).items():
+                if current.get(column) != value:
+                    raise ConflictError(f"{self._label()} ID {row_id} was modified by another session.")
+            if check is not None:
+                check(current)
+            changes = self._typed_values(changes)
+            if self.wal_path:
+                self._log(row_id, changes)
+                row = self._apply(row_id, changes)
+            else:
+                df = df.copy()
+                for column, value in changes.items():
+                    df.loc[mask, column] = value
+                self._write(df)
+                row = df[mask].to_dict(orient='records')[0]
+            self._row_changed(row)
+            return row
+
+    def _apply(self, row_id, changes: dict, copy: bool = True) -> Optional[dict]:
+        # With copy=True the cached table is replaced by an updated copy, as `data()` may have handed it out
+        mask = self._df[self.id_column] == row_id if not self._df.empty else None
+        if mask is None or not mask.any():
+            return None
+        df = self._df.copy() if copy else self._df
+        for column, value in changes.items():
+            df.loc[mask, column] = value
+        self._df = df
+        return df[mask].to_dict(orient='records')[0]
+
+    def _log(self, row_id, changes: dict):
+        record = {'id': _json_value(row_id), 'changes': {column: _json_value(value) for column, value in changes.items()}}
+        line = (json.dumps(record) + '\n').encode()
+        with open(self.wal_path, 'ab') as file:
+            file.write(line)
+            _fsync(file)
+        self._wal_offset += len(line)
+        self._wal_records += 1
+        self._signature = self._file_signature()
+        if self._wal_records >= self.compact_after:
+            self._schedule_compaction()
+
+    def _schedule_compaction(self):
+        if self._compacting:
+            return
+        self._compacting = True
+
+        def run():
+            try:
+                self.compact()
+            finally:
+                self._compacting = False
+
+        threading.Thread(target=run, name=f"compact-{os.path.basename(self.file_path)}", daemon=True).start()
+
+    def compact(self):
+        """
+        Write the current table as a fresh CSV snapshot and truncate the mutation log.
+        """
+        with self._exclusive():
+            self._write(self.data())
+            self._truncate_log()
+
+    def _truncate_log(self):
+        if self.wal_path and os.path.exists(self.wal_path):
+            with open(self.wal_path, 'wb') as file:
+                _fsync(file)
+        self._wal_offset = 0
+        self._wal_records = 0
+        self._signature = self._file_signature()
+
+    def save(self, df: pd.DataFrame):
+        """
+        Replace the table and write it through to disk.
+
+        Args:
+            df (pd.DataFrame): The new content of the table. This is a blind overwrite: rows changed
+                by other sessions since `df` was read are replaced.
+        """
+        with self._exclusive():
+            self._pending = []
+            self._positions = None
+            self._write(self._typed(df))
+            self._truncate_log()
+            self._track_max_id()
+            self._reloaded()
+
+    def _write(self, df: pd.DataFrame):
+        """Write the table to disk atomically and make it the cached copy, without invalidating derived indexes."""
+        tmp_path = f"{self.file_path}.tmp"
+        with open(tmp_path, 'w', newline='') as file:
+            df.to_csv(file, index=False, date_format=DATE_FORMAT)
+            _fsync(file)
+        os.replace(tmp_path, self.file_path)
+        if COLUMNAR_SNAPSHOTS:
+            stat = os.stat(self.file_path)
+            write_table(self._typed(df), columnar_path(self.file_path), source_inode=stat.st_ino,
+                        source_size=stat.st_size)
+        self._df = df
+        self._signature = self._file_signature()
+
+
+class FleetStore(TableStore):
+    """In-memory view of `cars.csv` with a type/price index for searches."""
+
+    def __init__(self, file_path: str, **kwargs):
+        super().__init__(file_path, **kwargs)
+        self._fleet_index = None
+
+    def _on_reload(self):
+        # Rebuilt lazily on the next search
+        self._fleet_index = None
+
+    def _on_row_changed(self, car: dict):
+        if self._fleet_index is not None:
+            self._fleet_index.sync(car)
+
+    def price(self, car_id: int):
+        """
+        Retrieve the daily price of a car.
+
+        Raises:
+            ValueError: If the car does not exist.
+        """
+        car = self.get(car_id)
+        if car is None:
+            raise ValueError(f"Car ID {car_id} does not exist.")
+        return car['price']
+
+    def search(self, car_type: Optional[str] = None, price_range=None, where: Optional[Callable] = None,
+               offset: int = 0, limit: Optional[int] = None) -> pd.DataFrame:
+        """
+        Find cars of a type within a price range, cheapest first, through the sorted fleet index.
+
+        Args:
+            car_type (str, optional): Exact car type, None for the whole fleet.
+            price_range (tuple, optional): (min_price, max_price), both included.
+            where (callable, optional): Returns a boolean mask for a list of car IDs, e.g.
+                `lambda car_ids: booking_store.available_mask(car_ids, start, end)`.
+            offset (int): Number of matching cars to skip.
+            limit (int, optional): Maximum number of cars to return, None for all.
+
+        Returns:
+            pd.DataFrame: The matching cars, ordered by price then car ID.
+        """
+        min_price, max_price = price_range if price_range else (None, None)
+        # The iterator reads a snapshot of the index, so `where` runs without the fleet lock held
+        car_ids = self.fleet_index().search(car_type, min_price, max_price)
+        return take(car_ids, self.rows, where, offset, limit)
+
+    def fleet_index(self) -> FleetIndex:
+        """
+        Return the type/price index of the current table, building it if needed.
+        """
+        with self._lock:
+            cars_df = self.data()
+            if self._fleet_index is None:
+                self._fleet_index = FleetIndex.from_cars(cars_df)
+            return self._fleet_index
+
+
+class BookingStore(TableStore):
+    """In-memory view of `bookings.csv` with write-through mutations and an availability index."""
+
+    date_columns = BOOKING_DATE_COLUMNS
+
+    def __init__(self, file_path: str, **kwargs):
+        super().__init__(file_path, **kwargs)
+        self._availability = None
+        self._user_index = None
+
+    def _on_reload(self):
+        # Rebuilt lazily on the next query
+        self._availability = None
+        self._user_index = None
+
+    def _on_row_changed(self, booking: dict):
+        if self._availability is not None:
+            self._availability.sync(booking)
+        if self._user_index is not None:
+            self._user_index.sync(booking)
+
+    def availability(self) -> AvailabilityIndex:
+        """
+        Return the availability index of the current table, building it if needed.
+        """
+        with self._lock:
+            bookings_df = self.data()
+            if self._availability is None:
+                self._availability = AvailabilityIndex.from_bookings(bookings_df)
+            return self._availability
+
+    def user_bookings(self, user_id: int, statuses) -> pd.DataFrame:
+        """
+        Retrieve the bookings of a user with one of the given statuses, through the per-user index.
+
+        Args:
+            user_id (int): ID of the user.
+            statuses: Booking statuses to include.
+
+        Returns:
+            pd.DataFrame: The bookings, by ascending booking ID.
+        """
+        return self.rows(self.user_booking_ids(user_id, statuses)).reset_index(drop=True)
+
+    def user_booking_ids(self, user_id: int, statuses) -> list:
+        """
+        Return the IDs of a user's bookings with one of the given statuses, in ascending order.
+        """
+        with self._lock:
+            return self.user_index().booking_ids(user_id, statuses)
+
+    def user_bookings_page(self, user_id: int, statuses, page_size: int,
+                           cursor: Optional[str] = None) -> Tuple[pd.DataFrame, Optional[str]]:
+        """
+        Retrieve one page of a user's bookings with the given statuses, latest start date first.
+
+        Pages are found by binary search in the per-user index, so any page costs the same as the first.
+
+        Args:
+            user_id (int): ID of the user.
+            statuses: Booking statuses to include.
+            page_size (int): Maximum number of bookings in the page.
+            cursor (str, optional): `next_cursor` returned with the previous page, None for the first page.
+
+        Returns:
+            tuple: The bookings of the page, and the cursor of the next page (None on the last page).
+
+        Raises:
+            ValueError: If the cursor is malformed.
+        """
+        booking_ids, next_cursor = self.user_booking_ids_page(user_id, statuses, page_size, cursor)
+        return self.rows(booking_ids).reset_index(drop=True), next_cursor
+
+    def user_booking_ids_page(self, user_id: int, statuses, page_size: int,
+                              cursor: Optional[str] = None) -> Tuple[list, Optional[str]]:
+        """
+        Same as `user_bookings_page`, returning the booking IDs of the page instead of the rows.
+        """
+        with self._lock:
+            return self.user_index().page(user_id, statuses, page_size, cursor)
+
+    def user_index(self) -> UserBookingIndex:
+        """
+        Return the per-user index of the current table, building it if needed.
+        """
+        with self._lock:
+            bookings_df = self.data()
+            if self._user_index is None:
+                self._user_index = UserBookingIndex.from_bookings(bookings_df)
+            return self._user_index
+
+    def is_car_available(self, car_id: int, start_date, end_date, exclude_booking_id=None) -> bool:
+        """
+        Check if a car has no confirmed booking overlapping the given period.
+
+        Args:
+            car_id (int): ID of the car to check.
+            start_date: Start of the rental period (date, datetime or dd/mm/YYYY string).
+            end_date: End of the rental period (date, datetime or dd/mm/YYYY string).
+            exclude_booking_id (int, optional): Booking to ignore, e.g. the one being moved to new dates.
+
+        Returns:
+            bool: True if the car is available, False otherwise.
+        """
+        return self.availability().is_available(car_id, start_date, end_date, exclude_booking_id)
+
+    def available_mask(self, car_ids, start_date, end_date):
+        """
+        Check the availability of many cars in one vectorized pass.
+
+        Args:
+            car_ids: Sequence (list, array or Series) of car IDs.
+            start_date: Start of the rental period (date, datetime or dd/mm/YYYY string).
+            end_date: End of the rental period (date, datetime or dd/mm/YYYY string).
+
+        Returns:
+            np.ndarray: Boolean array aligned with `car_ids`, True where the car is available.
+        """
+        return self.availability().available_mask(car_ids, start_date, end_date)
+
+
+def _create_stores():
+    if STORAGE_BACKEND == 'sqlite':
+        from sqlite_store import SqliteBookingStore, SqliteDatabase, SqliteFleetStore, SqliteUserStore
+        database = SqliteDatabase(SQLITE_FILE_PATH)
+        return (SqliteFleetStore(database, CARS_FILE_PATH, id_column='car_id'),
+                SqliteBookingStore(database, BOOKINGS_FILE_PATH, id_column='booking_id'),
+                SqliteUserStore(database, USERS_FILE_PATH, id_column='user_id', first_id=101))
+    if STORAGE_BACKEND != 'csv':
+        raise ValueError(f"Unknown storage backend '{STORAGE_BACKEND}'. Valid backends are 'csv' and 'sqlite'.")
+    return (FleetStore(CARS_FILE_PATH, id_column='car_id'),
+            BookingStore(BOOKINGS_FILE_PATH, id_column='booking_id', mutation_log=MUTATION_LOG),
+            TableStore(USERS_FILE_PATH, id_column='user_id', first_id=101))
+
+
+fleet_store, booking_store, user_store = _create_stores()
+
+_stores = {store.file_path: store for store in (fleet_store, booking_store, user_store)}
+
+# Bookings joined with their car's attributes, for every booking listing
+booking_view = BookingView(booking_store, fleet_store)
+_stores_lock = threading.Lock()
+
+
+def get_store(file_path: str) -> TableStore:
+    """
+    Return the shared store for a CSV file, creating a plain `TableStore` for unknown paths.
+
+    With the SQLite backend the cars, bookings and users paths map to their database tables.
+    """
+    with _stores_lock:
+        if file_path not in _stores:
+            _stores[file_path] = TableStore(file_path)
+        return _stores[file_path]
+
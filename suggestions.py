@@ -0,0 +1,58 @@
+from datetime import date
+from dates import to_ordinal
+from store import booking_store, fleet_store
+
+# Alternative cars are searched among cars of the same type priced within this fraction of the requested car
+PRICE_BAND = 0.25
+
+
+def suggest_alternatives(car_id: int, start_date, end_date, windows: int = 3, cars: int = 3,
+                         within_days: int = 60, price_band: float = PRICE_BAND) -> dict:
+    """
+    Find what to offer when a car is not available: other dates for the same car, and other cars for the same dates.
+
+    Both answers come from the in-memory indexes (availability index and sorted fleet index), in one call.
+
+    Args:
+        car_id (int): ID of the requested car.
+        start_date: Requested start (date, datetime or dd/mm/YYYY string).
+        end_date: Requested end (date, datetime or dd/mm/YYYY string).
+        windows (int): Maximum number of free periods of the requested car to return.
+        cars (int): Maximum number of alternative cars to return.
+        within_days (int): How far before and after the requested period to look for free periods.
+        price_band (float): Alternative cars cost at most this fraction more or less than the requested car.
+
+    Returns:
+        dict: `available` (bool, whether the requested car is free), `free_windows` (list of periods of
+            the same length for the requested car, nearest first, with dd/mm/YYYY dates) and
+            `alternative_cars` (list of car records of the same type, available for the requested
+            dates, closest price first).
+
+    Raises:
+        ValueError: If the car does not exist.
+    """
+    car = fleet_store.get(car_id)
+    if car is None:
+        raise ValueError(f"Car ID {car_id} does not exist.")
+    start, end = to_ordinal(start_date), to_ordinal(end_date)
+
+    index = booking_store.availability()
+    free_windows = [
+        {'start_date': date.fromordinal(first).strftime('%d/%m/%Y'),
+         'end_date': date.fromordinal(last).strftime('%d/%m/%Y')}
+        for first, last in index.free_windows(car_id, start, end, count=windows, within_days=within_days)
+    ]
+
+    price = float(car['price'])
+    candidates = fleet_store.search(
+        car['car_type'], (price * (1 - price_band), price * (1 + price_band)),
+        where=lambda car_ids: index.available_mask(car_ids, start, end))
+    candidates = candidates[candidates['car_id'] != car_id]
+    distance = abs(candidates['price'].to_numpy(dtype='float64') - price)
+    alternatives = candidates.iloc[distance.argsort(kind='stable')[:cars]]
+
+    return {
+        'available': index.is_available(car_id, start, end),
+        'free_windows': free_windows,
+        'alternative_cars': alternatives.to_dict(orient='records'),
+    }
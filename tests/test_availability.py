@@ -0,0 +1,37 @@
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from availability import CarIntervals
+
+
+def _overlaps(bookings, start, end, exclude_booking_id=None):
+    return any(s <= end and e >= start and booking_id != exclude_booking_id for booking_id, s, e in bookings)
+
+
+def test_overlaps_with_exclusion_matches_a_linear_scan():
+    rng = random.Random(7)
+    for _ in range(200):
+        intervals = CarIntervals()
+        bookings = []
+        for booking_id in range(rng.randint(0, 12)):
+            start = rng.randint(0, 60)
+            end = start + rng.randint(0, 15)
+            intervals.add(booking_id, start, end)
+            bookings.append((booking_id, start, end))
+        for _ in range(20):
+            start = rng.randint(-5, 80)
+            end = start + rng.randint(0, 10)
+            exclude = rng.choice([None, rng.randint(0, 12)])
+            assert intervals.overlaps(start, end, exclude) == _overlaps(bookings, start, end, exclude)
+
+
+def test_excluding_the_only_overlapping_booking():
+    intervals = CarIntervals()
+    intervals.add(1, 10, 20)
+    intervals.add(2, 30, 40)
+    assert intervals.overlaps(15, 18)
+    assert not intervals.overlaps(15, 18, exclude_booking_id=1)
+    assert intervals.overlaps(15, 35, exclude_booking_id=1)
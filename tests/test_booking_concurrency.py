@@ -0,0 +1,158 @@
+"""
+Stress test for concurrent booking mutations.
+
+Several processes book the same car for the same dates and each tries to confirm its own
+bookings, on every storage backend. Exactly one confirmation may win, every booking gets its
+own ID and no row is lost. Run with pytest, or directly: `python tests/test_booking_concurrency.py`.
+Writers serialize on one file lock per table; the compare-and-swap tests below cover the
+`expected=` check that lets sessions read without holding it.
+"""
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Spawned workers inherit sys.path, so store.py and the Streamlit pages' crud.py import there too
+sys.path[:0] = [REPO_ROOT, os.path.join(REPO_ROOT, 'Rental-Car-Business-Demo', 'pages')]
+
+import pytest
+
+PROCESSES = 8
+BOOKINGS_PER_PROCESS = 10
+CAR_ID = 7
+START_DATE, END_DATE = '10/02/2031', '12/02/2031'
+
+BACKENDS = {
+    'csv': {},
+    'wal': {'RENTAL_MUTATION_LOG': '1'},
+    'sqlite': {'RENTAL_STORAGE_BACKEND': 'sqlite'},
+}
+
+
+def _book_and_confirm(count: int) -> tuple:
+    # Runs in a fresh process, so store.py picks up the backend from the environment
+    import crud
+    from store import booking_store
+
+    booking_ids, confirmed = [], 0
+    for _ in range(count):
+        booking = booking_store.insert({'car_id': CAR_ID, 'user_id': 101, 'start_date': START_DATE,
+                                        'end_date': END_DATE, 'total_price': 100, 'booking_status': 1})
+        booking_ids.append(int(booking['booking_id']))
+        try:
+            crud.confirm_booking(booking['booking_id'])
+            confirmed += 1
+        except ValueError:
+            pass
+    return booking_ids, confirmed
+
+
+def _summary() -> dict:
+    import pandas as pd
+    from store import booking_store
+
+    bookings = booking_store.data()
+    confirmed = bookings[(bookings['car_id'] == CAR_ID) & (bookings['booking_status'] == 2)
+                         & (bookings['start_date'] == pd.Timestamp(2031, 2, 10))]
+    return {'rows': len(bookings), 'booking_ids': [int(i) for i in bookings['booking_id']],
+            'confirmed': len(confirmed)}
+
+
+def run_stress(workdir: str) -> tuple:
+    """
+    Run the workers against a copy of the data in `workdir`, using the backend set in the environment.
+
+    Returns:
+        tuple: The table summary before and after, the booking IDs handed out and the number of
+            confirmations the workers saw succeed.
+    """
+    shutil.copytree(os.path.join(REPO_ROOT, 'Rental-Car-Business-Demo', 'data'),
+                    os.path.join(workdir, 'Rental-Car-Business-Demo', 'data'))
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        context = multiprocessing.get_context('spawn')
+        with context.Pool(1) as pool:
+            before = pool.apply(_summary)
+        with context.Pool(PROCESSES) as pool:
+            results = pool.map(_book_and_confirm, [BOOKINGS_PER_PROCESS] * PROCESSES)
+        with context.Pool(1) as pool:
+            after = pool.apply(_summary)
+    finally:
+        os.chdir(cwd)
+    booking_ids = [booking_id for ids, _ in results for booking_id in ids]
+    return before, after, booking_ids, sum(confirmed for _, confirmed in results)
+
+
+def check_stress(before: dict, after: dict, booking_ids: list, confirmed: int):
+    assert confirmed == 1
+    assert after['confirmed'] == 1
+    assert len(booking_ids) == PROCESSES * BOOKINGS_PER_PROCESS
+    assert len(set(booking_ids)) == len(booking_ids)
+    assert len(set(after['booking_ids'])) == len(after['booking_ids'])
+    assert set(booking_ids) <= set(after['booking_ids'])
+    assert set(before['booking_ids']) <= set(after['booking_ids'])
+    assert after['rows'] == before['rows'] + len(booking_ids)
+
+
+def _booking_table(tmp_path):
+    from store import TableStore
+
+    path = tmp_path / 'bookings.csv'
+    path.write_text("booking_id,car_id,user_id,start_date,end_date,total_price,booking_status\n"
+                    "1,7,101,10/02/2031,12/02/2031,100,1\n")
+    return TableStore(str(path), id_column='booking_id')
+
+
+def test_update_with_stale_expected_values_conflicts(tmp_path):
+    from store import ConflictError, TableStore
+
+    first = _booking_table(tmp_path)
+    second = TableStore(first.file_path, id_column='booking_id')
+    seen = second.get(1)
+    first.update(1, expected={'booking_status': 1}, booking_status=2)
+    with pytest.raises(ConflictError):
+        second.update(1, expected={'booking_status': seen['booking_status']}, booking_status=0)
+    assert second.get(1)['booking_status'] == 2
+
+
+def test_retry_on_conflict_rereads_and_succeeds(tmp_path):
+    from store import TableStore, retry_on_conflict
+
+    store = _booking_table(tmp_path)
+    other = TableStore(store.file_path, id_column='booking_id')
+    attempts = []
+
+    @retry_on_conflict
+    def add_fee():
+        booking = store.get(1)
+        if not attempts:
+            # Another session changes the price between our read and our write
+            other.update(1, total_price=booking['total_price'] + 50)
+        attempts.append(booking['total_price'])
+        store.update(1, expected={'total_price': booking['total_price']}, total_price=booking['total_price'] + 10)
+
+    add_fee()
+    assert attempts == [100, 150]
+    assert store.get(1)['total_price'] == 160
+
+
+@pytest.mark.parametrize('backend', sorted(BACKENDS))
+def test_concurrent_booking_and_confirmation(backend, tmp_path, monkeypatch):
+    for name in ('RENTAL_STORAGE_BACKEND', 'RENTAL_MUTATION_LOG', 'RENTAL_SQLITE_PATH'):
+        monkeypatch.delenv(name, raising=False)
+    for name, value in BACKENDS[backend].items():
+        monkeypatch.setenv(name, value)
+    check_stress(*run_stress(str(tmp_path)))
+
+
+if __name__ == '__main__':
+    for backend, environment in BACKENDS.items():
+        for name in ('RENTAL_STORAGE_BACKEND', 'RENTAL_MUTATION_LOG', 'RENTAL_SQLITE_PATH'):
+            os.environ.pop(name, None)
+        os.environ.update(environment)
+        with tempfile.TemporaryDirectory() as workdir:
+            check_stress(*run_stress(workdir))
+        print(f"{backend}: OK")
@@ -0,0 +1,73 @@
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import pytest
+
+from chunking import chunk_markdown
+
+RULES_PATH = os.path.join(REPO_ROOT, 'Rental-Car-Business-Demo', 'data', 'company_rules.md')
+
+SECTION_BODY = (
+    "Bookings can be changed online. Changes are free up to two days before the start date.\n"
+    "Later changes cost a fee.\n"
+    "\n"
+    "- **Cancellation**: free up to 48 hours before pick-up.\n"
+    "- **No-show**: the first day is charged.\n"
+    "\n\n"
+    + "A very long sentence without any full stop that goes on and on " * 8
+    + "and finally ends here. Short one! Another?  Last sentence."
+)
+DOCUMENT = (
+    "# Policies\n\n"
+    "## Company Policy Rules\n\n"
+    f"### 1. **Changes**\n{SECTION_BODY}\n\n"
+    "## FAQ\n\n"
+    "**Can I change my booking?**  \n"
+    f"{SECTION_BODY}\n"
+)
+
+
+def _bodies(chunks, heading):
+    # Chunk texts of one section or FAQ entry, without the heading line each part starts with
+    return [chunk['page_content'].split('\n', 1)[1] for chunk in chunks if chunk['heading'] == heading]
+
+
+@pytest.mark.parametrize('max_chars', [60, 120, 250, 1000])
+def test_parts_join_back_into_the_section_text(max_chars):
+    chunks = chunk_markdown(DOCUMENT, max_chars=max_chars, overlap=0)
+    for heading in ('1. Changes', 'Can I change my booking?'):
+        bodies = _bodies(chunks, heading)
+        assert ''.join(bodies) == SECTION_BODY
+        assert (len(bodies) > 1) == (max_chars < 1000)
+    assert all(len(chunk['page_content']) <= max_chars for chunk in chunks)
+
+
+def test_overlap_repeats_the_end_of_the_previous_part():
+    chunks = chunk_markdown(DOCUMENT, max_chars=200, overlap=40)
+    bodies = _bodies(chunks, '1. Changes')
+    assert len(bodies) > 1
+    for previous, current in zip(bodies, bodies[1:]):
+        repeated = current[:10]
+        assert repeated in previous[-40:]
+    assert all(len(chunk['page_content']) <= 200 for chunk in chunks)
+
+
+def test_headings_and_faq_entries_become_chunks():
+    chunks = chunk_markdown(DOCUMENT)
+    assert [(chunk['heading'], chunk['parent_heading'], chunk['part']) for chunk in chunks] == [
+        ('1. Changes', 'Company Policy Rules', 0),
+        ('Can I change my booking?', 'FAQ', 0),
+    ]
+    assert chunks[0]['page_content'] == f"### 1. **Changes**\n{SECTION_BODY}"
+
+
+def test_company_rules_are_split_per_rule_and_question():
+    with open(RULES_PATH, 'r') as file:
+        chunks = chunk_markdown(file.read(), max_chars=1000, overlap=150)
+    parents = [chunk['parent_heading'] for chunk in chunks]
+    assert parents.count('Company Policy Rules') == 18
+    assert parents.count('FAQ') == 18
+    assert all(len(chunk['page_content']) <= 1000 for chunk in chunks)
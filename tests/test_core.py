@@ -0,0 +1,22 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+# core.py needs the agent's dependencies (LangChain, LangGraph, Groq, fuzzywuzzy)
+messages = pytest.importorskip('langchain_core.messages')
+core = pytest.importorskip('core')
+
+
+def test_update_tool_messages_keeps_the_booking_fields():
+    booking = {"booking_id": 12, "car_id": 7, "name": "Toyota Corolla", "start_date": "10/02/2031",
+               "end_date": "12/02/2031", "total_price": 150, "booking_status": 1}
+    message = messages.ToolMessage(content=json.dumps([booking]), tool_call_id='call-1')
+
+    updated = core.update_tool_messages(message)
+
+    assert json.loads(updated.content) == [{"booking_id": 12, "car_id": 7, "name": "Toyota Corolla",
+                                            "start_date": "10/02/2031", "end_date": "12/02/2031"}]
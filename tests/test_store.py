@@ -0,0 +1,33 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from store import TableStore
+
+
+def _bookings(tmp_path, **kwargs):
+    path = tmp_path / 'bookings.csv'
+    path.write_text(
+        "booking_id,car_id,user_id,start_date,end_date,total_price,booking_status\n"
+        "1,7,101,01/03/2031,03/03/2031,150,1\n"
+        "2,8,102,05/03/2031,06/03/2031,100,1\n"
+    )
+    return TableStore(str(path), id_column='booking_id', **kwargs)
+
+
+def test_logged_update_does_not_change_a_table_already_handed_out(tmp_path):
+    store = _bookings(tmp_path, mutation_log=True)
+    before = store.data()
+    store.update(1, booking_status=2)
+    assert before['booking_status'].tolist() == [1, 1]
+    assert store.data()['booking_status'].tolist() == [2, 1]
+
+
+def test_replayed_log_does_not_change_a_table_already_handed_out(tmp_path):
+    reader = _bookings(tmp_path, mutation_log=True)
+    before = reader.data()
+    writer = TableStore(reader.file_path, id_column='booking_id', mutation_log=True)
+    writer.update(2, booking_status=0)
+    assert reader.data()['booking_status'].tolist() == [1, 0]
+    assert before['booking_status'].tolist() == [1, 1]
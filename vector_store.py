@@ -0,0 +1,159 @@
+import hashlib
+import json
+import os
+from typing import Callable, Optional, Tuple
+import numpy as np
+
+# Version of the sidecar layout, bumped whenever it changes incompatibly
+FORMAT_VERSION = 2
+
+
+def content_hash(text: str) -> str:
+    """Return the SHA-256 hex digest of a document's text."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def corpus_hash(docs: list) -> str:
+    """Return a hash of the texts of a list of documents, in order."""
+    digest = hashlib.sha256()
+    for doc in docs:
+        digest.update(content_hash(doc['page_content']).encode('ascii'))
+    return digest.hexdigest()
+
+
+def sidecar_path(path: str) -> str:
+    """Return the path of the document sidecar of a vector file (`vectors.npy` -> `vectors.docs.json`)."""
+    return os.path.splitext(path)[0] + '.docs.json'
+
+
+class VectorStore:
+    """
+    Document vectors as a float32 `.npy` matrix, one row per document, with a JSON sidecar.
+
+    The sidecar holds the documents (text and metadata), the hash of each text and of the whole
+    corpus, and the name of the embedding model, so a store can be checked against the current
+    documents and provider without reading the vectors. The matrix is memory-mapped read-only: opening a store costs a file header read,
+    and only the pages actually used are loaded, shared by every process on the host.
+    """
+
+    def __init__(self, vectors: np.ndarray, docs: list, model: Optional[str] = None, corpus: Optional[str] = None):
+        self.vectors = vectors
+        self.docs = docs
+        self.model = model
+        self.corpus_hash = corpus if corpus is not None else corpus_hash(docs)
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def matches(self, docs: list, model: Optional[str] = None) -> bool:
+        """Return whether the store holds the vectors of exactly these documents, in this order, by this model."""
+        return model == self.model and len(docs) == len(self.docs) and corpus_hash(docs) == self.corpus_hash
+
+    @classmethod
+    def open(cls, path: str) -> Optional['VectorStore']:
+        """
+        Memory-map a vector store.
+
+        Args:
+            path (str): The `.npy` file.
+
+        Returns:
+            VectorStore: The store, or None if it is missing, unreadable or its two files do not match.
+        """
+        try:
+            with open(sidecar_path(path), 'r') as file:
+                meta = json.load(file)
+            vectors = np.load(path, mmap_mode='r')
+        except (FileNotFoundError, ValueError, OSError):
+            return None
+        if meta.get('version') != FORMAT_VERSION or vectors.ndim != 2 or \
+                vectors.shape[0] != len(meta['docs']) or meta.get('vectors_inode') != os.stat(path).st_ino:
+            return None
+        return cls(vectors, meta['docs'], meta.get('model'), meta['corpus_hash'])
+
+    @classmethod
+    def write(cls, path: str, vectors, docs: list, model: Optional[str] = None) -> 'VectorStore':
+        """
+        Write a vector store atomically and open it.
+
+        Args:
+            path (str): The `.npy` file. The sidecar is written next to it.
+            vectors: One vector per document, as a 2-D array or a list of lists.
+            docs (list): The documents, dicts with a `page_content` key and any metadata.
+            model (str, optional): Name of the embedding model the vectors come from.
+
+        Returns:
+            VectorStore: The written store, memory-mapped.
+
+        Raises:
+            ValueError: If the number of vectors and documents differ.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[0] != len(docs):
+            raise ValueError(f"Expected one vector per document, got {vectors.shape[0]} vectors for {len(docs)} documents.")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as file:
+            np.save(file, vectors)
+        meta = {
+            'version': FORMAT_VERSION,
+            'dimension': int(vectors.shape[1]),
+            'model': model,
+            'vectors_inode': os.stat(temp_path).st_ino,
+            'corpus_hash': corpus_hash(docs),
+            'docs': [{**doc, 'content_hash': content_hash(doc['page_content'])} for doc in docs],
+        }
+        temp_sidecar = sidecar_path(path) + '.tmp'
+        with open(temp_sidecar, 'w') as file:
+            json.dump(meta, file)
+        # The sidecar names the inode of its matrix, so a reader that sees the new matrix with the old
+        # sidecar (or the reverse) rejects the pair instead of mixing them
+        os.replace(temp_path, path)
+        os.replace(temp_sidecar, sidecar_path(path))
+        return cls.open(path)
+
+
+def reindex(path: str, docs: list, embed: Callable[[list], np.ndarray],
+            model: Optional[str] = None) -> Tuple[VectorStore, dict]:
+    """
+    Bring a vector store up to date with a list of documents, embedding only what changed.
+
+    Vectors of documents whose text hash is already in the store (by the same model) are copied
+    over, whatever their position; only added or edited documents are embedded, in one batched
+    call, and documents no longer present are dropped.
+
+    Args:
+        path (str): The `.npy` file, which may not exist yet.
+        docs (list): The current documents, dicts with a `page_content` key and any metadata.
+        embed (callable): Returns one vector per text for a list of texts, e.g. `provider.embed_documents`.
+        model (str, optional): Name of the embedding model.
+
+    Returns:
+        tuple: The up-to-date store, and counts of `reused`, `embedded` and `removed` documents.
+    """
+    store = VectorStore.open(path)
+    if store is not None and store.matches(docs, model):
+        return store, {'reused': len(docs), 'embedded': 0, 'removed': 0}
+
+    known = {}
+    if store is not None and store.model == model:
+        for row, doc in enumerate(store.docs):
+            known.setdefault(doc['content_hash'], row)
+    hashes = [content_hash(doc['page_content']) for doc in docs]
+    missing = [position for position, text_hash in enumerate(hashes) if text_hash not in known]
+    embedded = np.asarray(embed([docs[position]['page_content'] for position in missing]), dtype=np.float32) \
+        if missing else None
+
+    dimension = embedded.shape[1] if embedded is not None else store.vectors.shape[1] if store is not None else 0
+    vectors = np.empty((len(docs), dimension), dtype=np.float32)
+    for position, text_hash in enumerate(hashes):
+        if text_hash in known:
+            vectors[position] = store.vectors[known[text_hash]]
+    if missing:
+        vectors[missing] = embedded
+    removed = len(set(known) - set(hashes))
+    return VectorStore.write(path, vectors, docs, model), \
+        {'reused': len(docs) - len(missing), 'embedded': len(missing), 'removed': removed}